@@ -0,0 +1,120 @@
+import math
+import threading
+import time
+
+
+class Rejected(Exception):
+    """הבקשה לא התקבלה - status ו-retry_after (שניות) לתגובה"""
+
+    def __init__(self, status, retry_after, message):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.message = message
+
+
+class AdmissionGate:
+    """הגבלת מספר הקריאות שרצות במקביל, עם תור חסום
+
+    עד max_concurrent קריאות רצות, עד max_queue נוספות מחכות (לכל היותר
+    queue_timeout שניות) ושאר הבקשות נדחות מיד. כך קריאות איטיות לא תופסות
+    את כל ה-threads של השרת. המגבלה היא לכל תהליך.
+    """
+
+    def __init__(self, max_concurrent=4, max_queue=8, queue_timeout=5.0, retry_after=5):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+
+    def acquire(self):
+        """תפיסת מקום - מחזיר פונקציה לשחרור (בטוח לקרוא לה יותר מפעם אחת)"""
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.rejected_full += 1
+                    raise Rejected(503, self.retry_after, 'התור מלא')
+                self.waiting += 1
+                try:
+                    deadline = time.monotonic() + self.queue_timeout
+                    while self.active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected_timeout += 1
+                            raise Rejected(503, self.retry_after, 'תם הזמן בתור')
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+
+        released = False
+
+        def release():
+            nonlocal released
+            with self._condition:
+                if released:
+                    return
+                released = True
+                self.active -= 1
+                self._condition.notify()
+
+        return release
+
+    def stats(self):
+        with self._condition:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected_full': self.rejected_full,
+                'rejected_timeout': self.rejected_timeout,
+            }
+
+
+class RateLimiter:
+    """token bucket לכל מפתח (משתמש / כתובת IP) - rate בקשות לדקה, עד burst ברצף"""
+
+    def __init__(self, rate_per_minute=6.0, burst=3, max_keys=10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, last)
+        self.limited = 0
+
+    def check(self, key):
+        """מוריד אסימון, או זורק Rejected(429) עם הזמן עד האסימון הבא"""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.limited += 1
+                raise Rejected(429, math.ceil((1 - tokens) / self.rate), 'יותר מדי שאלות')
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+
+    def _prune(self, now):
+        # דליים שהתמלאו בחזרה שקולים לדלי חדש
+        full = [key for key, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for key in full:
+            del self._buckets[key]
+
+    def stats(self):
+        with self._lock:
+            return {'keys': len(self._buckets), 'limited': self.limited,
+                    'rate_per_minute': self.rate * 60, 'burst': self.burst}
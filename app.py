@@ -1,20 +1,109 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, g, Response
+from flask import stream_with_context
+from flask import before_render_template, template_rendered
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
 from datetime import datetime, date
 import os
 import re
-from database import DatabaseManager
+import json
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from admission import AdmissionGate, RateLimiter, Rejected
+from lazy_database import LazyDatabaseManager
+from db_metrics import metrics
+from fragment_cache import FragmentCache
+from query_result import Row
 from dotenv import load_dotenv
 
 load_dotenv()
+
+class JSONProvider(DefaultJSONProvider):
+    """jsonify שיודע להמיר שורות תוצאה (Row) למילונים"""
+    @staticmethod
+    def default(o):
+        if isinstance(o, Row):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = JSONProvider(app)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'basket_check_secret_key_2025')
 
-# יצירת חיבור למסד נתונים (Turso)
-db = DatabaseManager()
+# מסד הנתונים (Turso) - נוצר בשימוש הראשון, בלי גישה לרשת בטעינת המודול.
+# create_app() מחמם את החיבור ברקע
+db = LazyDatabaseManager()
 
 # הגדרות Flask
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 
+# cache ל-HTML של דף הבית ורשימת המשחקים (FRAGMENT_CACHE_MB=0 מכבה)
+fragments = FragmentCache(
+    max_bytes=int(float(os.getenv('FRAGMENT_CACHE_MB', '16')) * 1024 * 1024),
+    ttl=float(os.getenv('FRAGMENT_CACHE_TTL', '15')),
+)
+
+@app.template_global()
+def fragment(*key, caller):
+    """{% call fragment(key...) %}...{% endcall %} - הבלוק מרונדר פעם אחת לכל מפתח"""
+    return Markup(fragments.get_or_render(key, lambda: str(caller()), reload=g.get('fresh_reads', False)))
+
+# read-your-writes: ה-cache של השאילתות וה-fragments מקומיים לכל worker, וכתיבה
+# מבטלת אותם רק ב-worker שביצע אותה. בקשות של משתמש שכתב ב-READ_YOUR_WRITES_SECONDS
+# האחרונות (לפחות ה-TTL הארוך ב-cache) קוראות ישירות מהמסד, בכל worker
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', '30'))
+
+def mark_write():
+    """סימון בסשן שהמשתמש כתב עכשיו"""
+    session['last_write'] = time.time()
+
+@app.before_request
+def read_your_writes():
+    if time.time() - session.get('last_write', 0) < READ_YOUR_WRITES_SECONDS:
+        g.fresh_reads = True
+        g.fresh_reads_token = db.set_fresh_reads()
+
+@app.teardown_request
+def reset_read_your_writes(exc):
+    token = g.pop('fresh_reads_token', None)
+    if token is not None:
+        db.reset_fresh_reads(token)
+
+# מדידת זמני בקשה: שאילתות (מספר וזמן) ורינדור תבניות, מדווחים ב-Server-Timing
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.request_stats, g.request_stats_token = metrics.start_request()
+
+def _template_started(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+def _template_finished(sender, template, context, **extra):
+    started = g.pop('render_started', None)
+    stats = g.get('request_stats')
+    if started is not None and stats is not None:
+        stats.render_time += time.perf_counter() - started
+
+before_render_template.connect(_template_started, app)
+template_rendered.connect(_template_finished, app)
+
+@app.after_request
+def add_server_timing(response):
+    token = g.pop('request_stats_token', None)
+    if token is None:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    stats = metrics.finish_request(token, route, elapsed)
+    if stats is not None:
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'render;dur={stats.render_time * 1000:.1f}, '
+            f'total;dur={elapsed * 1000:.1f}'
+        )
+    return response
+
 # הוספת פילטרים ו-tests מותאמים אישית לJinja2
 @app.template_filter('regex_match')
 def regex_match_filter(text, pattern):
@@ -73,20 +162,22 @@ def manager_required(f):
 def index():
     """דף הבית - הצגת משחקים קרובים"""
     try:
-        games = db.get_all_games('open')
+        # הגרסאות נקראות לפני השאילתה - כתיבה באמצע יוצרת מפתח חדש
+        versions = db.changes.versions()
+        key = ('index', versions.get('games', 0), is_logged_in(), is_manager())
         
-        # הוספת מידע על הרשמות לכל משחק
-        for game in games:
-            registrations = db.get_game_registrations(game['game_id'])
-            game['registrations_count'] = len(registrations)
-            player_registrations = [r for r in registrations if r['position_name'].startswith('Team A') or r['position_name'].startswith('Team B')]
-            game['available_spots'] = 10 - len(player_registrations)
+        def render_games():
+            # משחקים פתוחים עם מספר הנרשמים והמקומות הפנויים - שאילתה אחת
+            games = db.get_games_with_counts('open')
+            return render_template('_index_games.html', games=games, versions=versions)
         
-        return render_template('index.html', games=games)
+        games_html = fragments.get_or_render(key, render_games, reload=g.get('fresh_reads', False))
+        return render_template('index.html', games_html=Markup(games_html))
     except Exception as e:
         app.logger.error(f"Error in index: {str(e)}")
         flash('שגיאה בטעינת הנתונים', 'error')
-        return render_template('index.html', games=[])
+        return render_template('index.html',
+                               games_html=Markup(render_template('_index_games.html', games=[], versions={})))
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -145,35 +236,54 @@ def logout():
 # דפי משחקים
 @app.route('/games')
 def games_list():
-    """רשימת כל המשחקים"""
+    """רשימת כל המשחקים - בעמודים, ?q= מחפש בכל המשחקים"""
+    cursor = request.args.get('cursor')
+    search = request.args.get('q', '').strip()[:100]
     try:
-        games = db.get_all_games('open')
+        versions = db.changes.versions()
+        key = ('games_list', cursor, search, versions.get('games', 0), is_logged_in(), is_manager())
         
-        for game in games:
-            registrations = db.get_game_registrations(game['game_id'])
-            game['registrations'] = registrations
-            game['registrations_count'] = len(registrations)
-            player_registrations = [r for r in registrations if r['position_name'].startswith('Team A') or r['position_name'].startswith('Team B')]
-            game['available_spots'] = 10 - len(player_registrations)
+        def render_games():
+            page_cursor = cursor
+            try:
+                games, next_cursor = db.get_games_page('open', page_cursor, search=search)
+            except ValueError:
+                # cursor לא תקין - מתחילים מהעמוד הראשון
+                page_cursor = None
+                games, next_cursor = db.get_games_page('open', search=search)
+            
+            # כל ההרשמות של המשחקים בעמוד בשאילתה אחת
+            registrations = db.get_registrations_for_games([game['game_id'] for game in games])
+            for game in games:
+                game['registrations'] = registrations.get(game['game_id'], [])
+            
+            html = render_template('_games_list_body.html', games=games, cursor=page_cursor,
+                                   next_cursor=next_cursor, search=search, versions=versions)
+            return html, len(games)
         
-        return render_template('games_list.html', games=games)
+        games_html, games_count = fragments.get_or_render(key, render_games, reload=g.get('fresh_reads', False))
+        return render_template('games_list.html', games_html=Markup(games_html), games_count=games_count,
+                               search=search)
     except Exception as e:
         app.logger.error(f"Error in games_list: {str(e)}")
         flash('שגיאה בטעינת רשימת המשחקים', 'error')
-        return render_template('games_list.html', games=[])
+        return render_template('games_list.html', games_count=0, search=search,
+                               games_html=Markup(render_template('_games_list_body.html', games=[], versions={})))
 
 @app.route('/game/<int:game_id>')
 def game_detail(game_id):
     """פרטי משחק ספציפי"""
     try:
-        game = db.get_game_by_id(game_id)
+        # שלוש השאילתות בלתי תלויות - רצות במקביל
+        game, registrations, positions = db.gather(
+            (db.get_game_by_id, game_id),
+            (db.get_game_registrations, game_id),
+            (db.get_all_positions,),
+        )
         if not game:
             flash('המשחק לא נמצא', 'error')
             return redirect(url_for('games_list'))
         
-        registrations = db.get_game_registrations(game_id)
-        positions = db.get_all_positions()
-        
         # ארגון הרשמות לפי תפקידים
         registrations_by_position = {}
         for reg in registrations:
@@ -213,6 +323,7 @@ def register_to_game(game_id):
         result = db.register_to_game(game_id, session['user_id'], int(position_id))
         
         if result['success']:
+            mark_write()
             flash(result['message'], 'success')
         else:
             flash(result['message'], 'error')
@@ -228,6 +339,7 @@ def cancel_game_registration(game_id):
     success = db.cancel_registration(game_id, session['user_id'])
     
     if success:
+        mark_write()
         flash('ההרשמה בוטלה בהצלחה', 'success')
     else:
         flash('שגיאה בביטול ההרשמה', 'error')
@@ -258,6 +370,7 @@ def create_game():
                                     session['user_id'], description, max_players)
             
             if game_id:
+                mark_write()
                 flash('המשחק נוצר בהצלחה!', 'success')
                 return redirect(url_for('game_detail', game_id=game_id))
             else:
@@ -271,65 +384,218 @@ def create_game():
 @app.route('/manage_games')
 @manager_required
 def manage_games():
-    """ניהול משחקים למנהלים"""
+    """ניהול משחקים למנהלים - בעמודים"""
+    cursor = request.args.get('cursor')
     try:
-        all_games = db.get_all_games(status=None)
-        my_games = [game for game in all_games if game['created_by'] == session['user_id']]
-        
-        for game in my_games:
-            registrations = db.get_game_registrations(game['game_id'])
-            game['registrations_count'] = len(registrations)
+        try:
+            (my_games, next_cursor), stats = db.gather(
+                (db.get_games_by_creator_page, session['user_id'], cursor),
+                (db.get_manager_stats, session['user_id']),
+            )
+        except ValueError:
+            # cursor לא תקין - מתחילים מהעמוד הראשון
+            cursor = None
+            (my_games, next_cursor), stats = db.gather(
+                (db.get_games_by_creator_page, session['user_id']),
+                (db.get_manager_stats, session['user_id']),
+            )
         
-        return render_template('manage_games.html', games=my_games)
+        return render_template('manage_games.html', games=my_games, stats=stats,
+                               cursor=cursor, next_cursor=next_cursor)
     except Exception as e:
         app.logger.error(f"Error in manage_games: {str(e)}")
         flash('שגיאה בטעינת ניהול המשחקים', 'error')
-        return render_template('manage_games.html', games=[])
+        return render_template('manage_games.html', games=[],
+                               stats={'total_games': 0, 'open_games': 0, 'total_registrations': 0})
 
 @app.route('/dashboard')
 @manager_required
 def dashboard():
     """לוח בקרה למנהלים"""
     try:
-        # סטטיסטיקות בסיסיות
-        all_games = db.get_all_games(status=None)
-        my_games = [game for game in all_games if game['created_by'] == session['user_id']]
-        
-        stats = {
-            'total_games': len(my_games),
-            'open_games': len([g for g in my_games if g['status'] == 'open']),
-            'total_registrations': 0
-        }
+        # סטטיסטיקות בסיסיות - הסינון והספירה מתבצעים ב-SQL
+        stats = db.get_manager_stats(session['user_id'])
+        my_games = db.get_games_by_creator(session['user_id'])
         
-        for game in my_games:
-            registrations = db.get_game_registrations(game['game_id'])
-            stats['total_registrations'] += len(registrations)
-        
-        return render_template('dashboard.html', games=my_games[:5], stats=stats)
+        # התבנית סופרת את המשחקים ומשווה תאריכים עם moment()
+        return render_template('manager_dashboard.html', my_games=my_games, user_games=[],
+                               stats=stats, moment=datetime.now)
     except Exception as e:
         app.logger.error(f"Error in dashboard: {str(e)}")
         flash('שגיאה בטעינת לוח הבקרה', 'error')
         return redirect(url_for('index'))
 
+def conditional_json(data, cache_control):
+    """תגובת JSON עם ETag לפי hash של התוכן - 304 בלי גוף אם If-None-Match תואם
+    
+    ה-ETag תלוי רק בנתונים, כך שהוא זהה בין workers ובין polls כל עוד
+    שום דבר לא השתנה. הנתונים מגיעים מה-cache של DatabaseManager.
+    """
+    response = jsonify(data)
+    response.headers['Cache-Control'] = cache_control
+    response.add_etag()
+    return response.make_conditional(request)
+
 # API endpoints
 @app.route('/api/positions')
 def api_positions():
     try:
-        positions = db.get_all_positions()
-        return jsonify(positions)
+        # אין נתיב כתיבה לתפקידים - הדפדפן שומר אותם 5 דקות
+        return conditional_json(db.get_all_positions(), 'public, max-age=300')
     except Exception as e:
         app.logger.error(f"Error in api_positions: {str(e)}")
         return jsonify({'error': 'שגיאה בטעינת התפקידים'}), 500
 
+@app.route('/api/games')
+def api_games():
+    """משחקים פתוחים בעמודים - ?cursor=...&limit=...&q=... (חיפוש בכותרת או במיקום)"""
+    try:
+        cursor, limit = request.args.get('cursor'), request.args.get('limit', type=int)
+        search = request.args.get('q', '').strip()[:100]
+        
+        games, next_cursor = db.get_games_page('open', cursor, limit, search)
+        return conditional_json({'games': games, 'next_cursor': next_cursor}, 'no-cache')
+    except ValueError:
+        return jsonify({'error': 'cursor לא תקין'}), 400
+    except Exception as e:
+        app.logger.error(f"Error in api_games: {str(e)}")
+        return jsonify({'error': 'שגיאה בטעינת המשחקים'}), 500
+
 @app.route('/api/game/<int:game_id>/registrations')
 def api_game_registrations(game_id):
     try:
-        registrations = db.get_game_registrations(game_id)
-        return jsonify(registrations)
+        cursor, limit = request.args.get('cursor'), request.args.get('limit', type=int)
+        
+        registrations, next_cursor = db.get_game_registrations_page(game_id, cursor, limit)
+        # שמות השחקנים - רק ב-cache של הדפדפן, ותמיד עם בדיקה מול השרת
+        return conditional_json({'registrations': registrations, 'next_cursor': next_cursor},
+                                'private, no-cache')
+    except ValueError:
+        return jsonify({'error': 'cursor לא תקין'}), 400
     except Exception as e:
         app.logger.error(f"Error in api_game_registrations: {str(e)}")
         return jsonify({'error': 'שגיאה בטעינת ההרשמות'}), 500
 
+# Server-Sent Events - עדכוני הרשמות ומשחקים בלי polling
+SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', '15'))
+SSE_STREAM_TTL = float(os.getenv('SSE_STREAM_TTL', '300'))
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', '3000'))
+# ריק = לפי סוג ה-worker: 200 עם gevent, 0 (SSE כבוי, הדפדפן עובר ל-polling) עם threads
+SSE_MAX_STREAMS = os.getenv('SSE_MAX_STREAMS')
+
+def sse_max_streams():
+    """מספר ה-streams המותר בתהליך
+    
+    stream פתוח תופס את ה-worker עד SSE_STREAM_TTL. ב-worker של gevent זה
+    greenlet זול, אבל ב-worker סינכרוני (או gthread) זה thread שלם, ולכן שם
+    SSE כבוי אלא אם SSE_MAX_STREAMS הוגדר - נמוך בהרבה ממספר ה-threads.
+    """
+    if SSE_MAX_STREAMS:
+        return int(SSE_MAX_STREAMS)
+    try:
+        from gevent import monkey
+    except ImportError:
+        return 0
+    # gunicorn -k gevent מבצע monkey-patch לפני טעינת האפליקציה ב-worker
+    return 200 if monkey.is_module_patched('socket') else 0
+
+def event_stream(topics):
+    """תגובת text/event-stream לנושאים של ה-ChangeBus
+    
+    כל חיבור פתוח עד SSE_STREAM_TTL, ואז הדפדפן מתחבר מחדש עם
+    Last-Event-ID ומקבל את האירועים שפספס. מעבר למגבלה מחזירים 503
+    והדפדפן עובר ל-polling.
+    """
+    if db.changes.subscribers >= sse_max_streams():
+        return Response('', status=503, headers={'Retry-After': '30'})
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    start_id = db.changes.last_id
+    events = db.changes.events(topics, last_event_id, heartbeat=SSE_HEARTBEAT, timeout=SSE_STREAM_TTL)
+    
+    def generate():
+        yield f"retry: {SSE_RETRY_MS}\nid: {last_event_id if last_event_id is not None else start_id}\n\n"
+        for item in events:
+            if item is None:
+                yield ": heartbeat\n\n"
+                continue
+            event_id, _, event, data = item
+            yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data or {})}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/game/<int:game_id>/events')
+def api_game_events(game_id):
+    """שינויים בהרשמות של משחק אחד"""
+    return event_stream([f'game:{game_id}'])
+
+@app.route('/api/games/events')
+def api_games_events():
+    """שינויים ברשימת המשחקים - משחק חדש או שינוי בהרשמות"""
+    return event_stream(['games'])
+
+@app.route('/api/db/pool')
+@manager_required
+def api_db_pool():
+    """סטטיסטיקות ה-pool של החיבורים ל-Turso"""
+    return jsonify(db.pool_stats())
+
+@app.route('/api/db/cache')
+@manager_required
+def api_db_cache():
+    """סטטיסטיקות ה-cache של השאילתות"""
+    return jsonify(db.cache_stats())
+
+@app.route('/api/db/fragments')
+@manager_required
+def api_db_fragments():
+    """סטטיסטיקות ה-cache של ה-HTML"""
+    return jsonify(fragments.stats())
+
+@app.route('/api/db/group_commit')
+@manager_required
+def api_db_group_commit():
+    """סטטיסטיקות איחוד ההרשמות לבקשות משותפות"""
+    return jsonify(db.group_commit_stats())
+
+@app.route('/api/db/slow_queries')
+@manager_required
+def api_db_slow_queries():
+    """השאילתות האיטיות לפי fingerprint"""
+    return jsonify(db.slow_query_stats())
+
+@app.route('/api/db/replica')
+@manager_required
+def api_db_replica():
+    """מצב העותק המקומי של מסד הנתונים"""
+    return jsonify(db.replica_stats())
+
+# liveness / readiness
+@app.route('/healthz')
+def healthz():
+    """התהליך חי - לא תלוי במסד הנתונים"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """מוכן לקבל תעבורה - החימום של החיבור ל-Turso הצליח"""
+    db.warm_up()
+    status = db.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """מדדי שאילתות ובקשות בפורמט Prometheus (METRICS_TOKEN - חובת Bearer token)"""
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 # Context processors
 @app.context_processor
 def inject_user():
@@ -375,6 +641,49 @@ def time_filter(value):
     return value
 
 # צ'אטבוט
+# קריאה לשרת ה-RAG לוקחת שניות עד דקות - מספר הקריאות במקביל וקצב השאלות לכל
+# משתמש מוגבלים, כדי שעומס בצ'אט לא יתפוס את ה-threads של דפי המשחקים
+CHATBOT_URL = os.getenv('CHATBOT_URL', 'http://127.0.0.1:8000')
+
+chatbot_gate = AdmissionGate(
+    max_concurrent=int(os.getenv('CHATBOT_MAX_CONCURRENT', '4')),
+    max_queue=int(os.getenv('CHATBOT_MAX_QUEUE', '8')),
+    queue_timeout=float(os.getenv('CHATBOT_QUEUE_TIMEOUT', '5')),
+)
+chatbot_limiter = RateLimiter(
+    rate_per_minute=float(os.getenv('CHATBOT_RATE_PER_MINUTE', '6')),
+    burst=int(os.getenv('CHATBOT_BURST', '3')),
+)
+
+# חיבורי keep-alive לשרת ה-RAG במקום חיבור חדש לכל שאלה
+chatbot_http = requests.Session()
+_chatbot_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=chatbot_gate.max_concurrent, max_retries=0)
+chatbot_http.mount('http://', _chatbot_adapter)
+chatbot_http.mount('https://', _chatbot_adapter)
+
+def chatbot_error(message, status=500, retry_after=None):
+    headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+    return jsonify({'error': message}), status, headers
+
+def admit_chatbot_request():
+    """בדיקת קצב למשתמש (או ל-IP) ותפיסת מקום - מחזיר (release, None) או (None, תגובת שגיאה)"""
+    key = f"user:{session['user_id']}" if is_logged_in() else f"ip:{request.remote_addr}"
+    try:
+        chatbot_limiter.check(key)
+        return chatbot_gate.acquire(), None
+    except Rejected as e:
+        if e.status == 429:
+            return None, chatbot_error(f'יותר מדי שאלות, נסה שוב בעוד {e.retry_after} שניות', 429, e.retry_after)
+        return None, chatbot_error("הצ'אטבוט עמוס כרגע, נסה שוב בעוד כמה שניות", 503, e.retry_after)
+
+def chatbot_upstream_error(upstream):
+    """תגובת שגיאה לפי התשובה של שרת ה-RAG"""
+    if upstream.status_code == 503:
+        # השרת עוד טוען את המודלים (חימום)
+        return chatbot_error("הצ'אטבוט עדיין נטען, נסה שוב בעוד כמה שניות", 503,
+                             upstream.headers.get('Retry-After', '5'))
+    return chatbot_error('שגיאה בשרת Ollama')
+
 @app.route('/chatbot')
 def chatbot():
     """דף הצ'אטבוט"""
@@ -383,34 +692,111 @@ def chatbot():
 @app.route('/api/chatbot', methods=['POST'])
 def chatbot_api():
     """API פנימי לצ'אטבוט שמתחבר ל-Ollama"""
+    data = request.get_json(silent=True) or {}
+    question = data.get('question', '').strip()
+    if not question:
+        return jsonify({'error': 'שאלה ריקה'}), 400
+    
+    release, rejected = admit_chatbot_request()
+    if rejected:
+        return rejected
     try:
-        import requests
-        
-        data = request.get_json()
-        question = data.get('question', '').strip()
-        
-        if not question:
-            return jsonify({'error': 'שאלה ריקה'}), 400
-        
         # קריאה ל-FastAPI של Ollama
-        ollama_response = requests.post(
-            'http://127.0.0.1:8000/chat',
+        ollama_response = chatbot_http.post(
+            f'{CHATBOT_URL}/chat',
             json={'question': question},
-            timeout=30
+            timeout=(5, 30)
         )
         
         if ollama_response.status_code == 200:
             return jsonify(ollama_response.json())
-        else:
-            return jsonify({'error': 'שגיאה בשרת Ollama'}), 500
+        return chatbot_upstream_error(ollama_response)
             
     except requests.exceptions.ConnectionError:
-        return jsonify({'error': 'לא ניתן להתחבר לשרת Ollama. ודא שהוא פועל על פורט 8000'}), 500
+        return chatbot_error('לא ניתן להתחבר לשרת Ollama. ודא שהוא פועל על פורט 8000')
     except requests.exceptions.Timeout:
-        return jsonify({'error': 'תם הזמן הקצוב לתשובה'}), 500
+        return chatbot_error('תם הזמן הקצוב לתשובה')
     except Exception as e:
-        return jsonify({'error': f'שגיאה: {str(e)}'}), 500
+        return chatbot_error(f'שגיאה: {str(e)}')
+    finally:
+        release()
+
+@app.route('/api/chatbot/stream', methods=['POST'])
+def chatbot_stream_api():
+    """כמו /api/chatbot, אבל מעביר את התשובה לדפדפן תוך כדי יצירה (שורות NDJSON)"""
+    data = request.get_json(silent=True) or {}
+    question = data.get('question', '').strip()
+    if not question:
+        return jsonify({'error': 'שאלה ריקה'}), 400
+    
+    release, rejected = admit_chatbot_request()
+    if rejected:
+        return rejected
+    upstream = None
+    
+    def close():
+        if upstream is not None:
+            upstream.close()
+        release()
+    
+    try:
+        # timeout לחיבור ולזמן בין חלקים - לא לכל התשובה
+        upstream = chatbot_http.post(f'{CHATBOT_URL}/chat/stream', json={'question': question},
+                                     stream=True, timeout=(5, 60))
+        if upstream.status_code != 200:
+            close()
+            return chatbot_upstream_error(upstream)
+        
+        def generate():
+            # המקום ב-gate נשמר עד סוף התשובה
+            try:
+                for chunk in upstream.iter_content(chunk_size=None):
+                    yield chunk
+            except requests.exceptions.RequestException:
+                yield json.dumps({'type': 'error', 'error': 'החיבור לשרת Ollama נותק'}, ensure_ascii=False) + '\n'
+            finally:
+                close()
+        
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        # לקוח שהתנתק לפני החלק הראשון - ה-finally של generate לא ירוץ
+        response.call_on_close(close)
+        return response
+    except Exception as e:
+        # כל כישלון לפני שהתשובה יצאה משחרר את המקום (release בטוח לקריאה חוזרת)
+        close()
+        if isinstance(e, requests.exceptions.Timeout):
+            return chatbot_error('תם הזמן הקצוב לתשובה')
+        if isinstance(e, requests.exceptions.RequestException):
+            return chatbot_error('לא ניתן להתחבר לשרת Ollama. ודא שהוא פועל על פורט 8000')
+        return chatbot_error(f'שגיאה: {str(e)}')
+
+@app.route('/api/chatbot/health')
+def chatbot_health():
+    """מצב שרת ה-RAG (ready / loading / offline) - בלי מקום בתור ובלי שאלה אמיתית"""
+    try:
+        ready = chatbot_http.get(f'{CHATBOT_URL}/ready', timeout=2)
+        return jsonify({'status': 'ready' if ready.status_code == 200 else 'loading'})
+    except requests.exceptions.RequestException:
+        return jsonify({'status': 'offline'})
+
+@app.route('/api/chatbot/stats')
+@manager_required
+def chatbot_stats():
+    """מצב התור והגבלת הקצב של הצ'אטבוט"""
+    return jsonify({'gate': chatbot_gate.stats(), 'rate_limit': chatbot_limiter.stats()})
+
+def create_app():
+    """נקודת הכניסה להרצה - מתחיל את חימום החיבור ברקע
+    
+    עדכוני SSE דורשים worker אסינכרוני: gunicorn -k gevent 'app:create_app()'.
+    עם worker סינכרוני SSE כבוי (ראו sse_max_streams) והדפים מתעדכנים ב-polling.
+    """
+    db.warm_up()
+    return app
 
 if __name__ == '__main__':
     print("מתחיל אפליקציית Flask עם מסד נתונים Turso...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # שרת הפיתוח מריץ thread לכל בקשה - כמה streams בודדים לא חוסמים אותו
+    SSE_MAX_STREAMS = SSE_MAX_STREAMS or '8'
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,36 @@
+import asyncio
+import functools
+from database import DatabaseManager
+
+
+class AsyncDatabaseManager:
+    """גרסת asyncio של DatabaseManager עם אותן מתודות
+
+    כל מתודה ציבורית של DatabaseManager זמינה כאן כ-coroutine, ורצה ב-thread
+    כך שה-event loop לא נחסם. החיבורים (pool), ה-cache והעותק המקומי משותפים
+    עם מופע ה-DatabaseManager שמתחת, לכן אפשר להשתמש בשניהם באותו תהליך.
+
+        adb = AsyncDatabaseManager(db)
+        game, registrations = await adb.gather(
+            adb.get_game_by_id(5),
+            adb.get_game_registrations(5),
+        )
+    """
+
+    def __init__(self, db=None):
+        self.db = db if db is not None else DatabaseManager()
+
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+
+        return method
+
+    async def gather(self, *coroutines):
+        """הרצת כמה קריאות במקביל - מחזיר את התוצאות לפי הסדר"""
+        return list(await asyncio.gather(*coroutines))
@@ -0,0 +1 @@
+"""כלי benchmark: שרת Turso מקומי, יצירת נתונים ותרחישי עומס"""
@@ -0,0 +1,278 @@
+"""הרצת תרחישי עומס על האפליקציה מול שרת Turso מקומי
+
+    python -m bench.seed --db bench.db --scale 10000
+    python -m bench.run --db bench.db --latency-ms 40 --jitter-ms 10 --concurrency 8 --requests 400
+
+האפליקציה רצה בתוך התהליך (Flask test client), ה-DatabaseManager שלה מדבר
+HTTP אמיתי עם bench.turso_server. לכל תרחיש מדווחים תפוקה, p50/p99, מספר
+הבקשות למסד הנתונים (round trips) לכל בקשה וקודי התגובה. קוד תגובה שאינו
+הצפוי לתרחיש (200 לדפים, 302 להרשמה) נספר כשגיאה, והסקריפט יוצא עם קוד 1.
+
+התרחיש burst פותח משחק חדש ושולח אליו --burst-size הרשמות בבת אחת, כל אחת
+ממשתמש אחר, ובודק במסד שאף עמדה לא נתפסה פעמיים.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+from bench.turso_server import StubTursoServer
+
+SCENARIOS = ('home', 'games', 'game_detail', 'register', 'dashboard', 'manage_games', 'burst')
+
+# קוד התגובה הצפוי - הרשמה מפנה חזרה לדף המשחק, כל השאר דפים
+EXPECTED_STATUS = {'register': 302, 'burst': 302}
+
+
+def count_errors(scenario, statuses):
+    expected = EXPECTED_STATUS.get(scenario, 200)
+    return sum(count for status, count in statuses.items() if status != expected)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+class Fixture:
+    """נתונים מהמסד שהתרחישים צריכים - משחקים פתוחים, מנהלים ושחקנים"""
+
+    def __init__(self, db_path):
+        conn = sqlite3.connect(db_path)
+        self.open_games = [row[0] for row in conn.execute("SELECT game_id FROM games WHERE status = 'open'")]
+        self.managers = [row for row in conn.execute(
+            "SELECT user_id, username, first_name FROM users WHERE user_type = 'manager'")]
+        self.max_user = conn.execute("SELECT MAX(user_id) FROM users").fetchone()[0]
+        self.positions = [row[0] for row in conn.execute("SELECT position_id FROM positions")]
+        conn.close()
+
+
+def _login(client, user_id, username, user_type, first_name):
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = username
+        session['user_type'] = user_type
+        session['first_name'] = first_name
+
+
+def make_request(scenario, fixture, rng):
+    """בניית פונקציה שמבצעת בקשה אחת של התרחיש עם client נתון"""
+    if scenario == 'home':
+        return lambda client: client.get('/')
+    if scenario == 'games':
+        return lambda client: client.get('/games')
+    if scenario == 'game_detail':
+        return lambda client: client.get(f'/game/{rng.choice(fixture.open_games)}')
+    if scenario == 'register':
+        def register(client):
+            user_id = rng.randint(1, fixture.max_user)
+            _login(client, user_id, f'user{user_id}', 'player', 'bench')
+            return client.post(f'/game/{rng.choice(fixture.open_games)}/register',
+                               data={'position_id': str(rng.choice(fixture.positions))})
+        return register
+    if scenario in ('dashboard', 'manage_games'):
+        def as_manager(client):
+            user_id, username, first_name = rng.choice(fixture.managers)
+            _login(client, user_id, username, 'manager', first_name)
+            return client.get(f'/{scenario}')
+        return as_manager
+    raise ValueError(f'תרחיש לא מוכר: {scenario}')
+
+
+def run_scenario(flask_app, server, scenario, fixture, requests_count, concurrency, warmup, seed):
+    rng = random.Random(seed)
+    request = make_request(scenario, fixture, rng)
+
+    warm_client = flask_app.test_client()
+    for _ in range(warmup):
+        request(warm_client)
+
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    remaining = [requests_count]
+
+    def worker():
+        client = flask_app.test_client()
+        local_latencies = []
+        local_statuses = Counter()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            started = time.perf_counter()
+            response = request(client)
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[response.status_code] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    db_requests_before = server.requests
+    db_statements_before = server.statements
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    count = len(latencies)
+    return {
+        'scenario': scenario,
+        'requests': count,
+        'concurrency': concurrency,
+        'throughput_rps': round(count / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'db_round_trips_per_request': round((server.requests - db_requests_before) / count, 2) if count else 0.0,
+        'db_statements_per_request': round((server.statements - db_statements_before) / count, 2) if count else 0.0,
+        'statuses': dict(statuses),
+        'errors': count_errors(scenario, statuses),
+    }
+
+
+def run_burst(flask_app, server, db_path, fixture, registrants, seed):
+    """פרץ הרשמות למשחק חדש - כל המשתמשים יוצאים יחד ומנסים עמדה אקראית"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    game_id = conn.execute(
+        "INSERT INTO games (title, game_date, game_time, location, max_players, created_by, status) "
+        "VALUES ('burst', date('now', '+7 days'), '20:00:00', 'bench', 10, ?, 'open')",
+        (fixture.managers[0][0],)).lastrowid
+    conn.commit()
+    conn.close()
+
+    users = rng.sample(range(1, fixture.max_user + 1), min(registrants, fixture.max_user))
+    choices = [(user_id, rng.choice(fixture.positions)) for user_id in users]
+    clients = []
+    for user_id, _ in choices:
+        client = flask_app.test_client()
+        _login(client, user_id, f'user{user_id}', 'player', 'bench')
+        clients.append(client)
+
+    latencies = [0.0] * len(choices)
+    statuses = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(choices))
+
+    def registrant(i):
+        _, position_id = choices[i]
+        barrier.wait()
+        started = time.perf_counter()
+        response = clients[i].post(f'/game/{game_id}/register', data={'position_id': str(position_id)})
+        latencies[i] = time.perf_counter() - started
+        with lock:
+            statuses[response.status_code] += 1
+
+    db_requests_before = server.requests
+    db_statements_before = server.statements
+    started = time.perf_counter()
+    threads = [threading.Thread(target=registrant, args=(i,)) for i in range(len(choices))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # בדיקת התוצאה ישירות במסד
+    conn = sqlite3.connect(db_path)
+    registered = conn.execute(
+        "SELECT COUNT(*) FROM game_registrations WHERE game_id = ? AND status = 'confirmed'", (game_id,)).fetchone()[0]
+    double_booked = conn.execute(
+        "SELECT COUNT(*) FROM (SELECT position_id FROM game_registrations WHERE game_id = ? AND status = 'confirmed' "
+        "GROUP BY position_id HAVING COUNT(*) > 1)", (game_id,)).fetchone()[0]
+    conn.close()
+
+    count = len(choices)
+    return {
+        'scenario': 'burst',
+        'requests': count,
+        'concurrency': count,
+        'throughput_rps': round(count / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'db_round_trips_per_request': round((server.requests - db_requests_before) / count, 2) if count else 0.0,
+        'db_statements_per_request': round((server.statements - db_statements_before) / count, 2) if count else 0.0,
+        'statuses': dict(statuses),
+        'errors': count_errors('burst', statuses),
+        'registered': registered,
+        'positions_requested': len({position_id for _, position_id in choices}),
+        'double_booked_positions': double_booked,
+    }
+
+
+def print_report(results):
+    header = (f"{'scenario':<14}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'db rt/req':>11}{'stmts/req':>11}"
+              f"{'errors':>8}  statuses")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['scenario']:<14}{r['throughput_rps']:>9}{r['p50_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['db_round_trips_per_request']:>11}{r['db_statements_per_request']:>11}{r['errors']:>8}"
+              f"  {r['statuses']}")
+        if r['scenario'] == 'burst':
+            print(f"{'':<14}registered {r['registered']}/{r['positions_requested']} positions, "
+                  f"double-booked: {r['double_booked_positions']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark לאפליקציה מול Turso מקומי')
+    parser.add_argument('--db', required=True, help='קובץ SQLite שנוצר עם bench.seed')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='רשימה מופרדת בפסיקים')
+    parser.add_argument('--requests', type=int, default=200, help='בקשות לכל תרחיש')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--no-cache', action='store_true', help='כיבוי ה-cache של DatabaseManager')
+    parser.add_argument('--burst-size', type=int, default=200, help='מספר הנרשמים בתרחיש burst')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='שמירת התוצאות לקובץ JSON')
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    fixture = Fixture(args.db)
+    server = StubTursoServer(args.db, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms).start()
+
+    # האפליקציה נטענת רק אחרי שהשרת המקומי רץ והסביבה מצביעה עליו
+    os.environ['TURSO_DATABASE_URL'] = server.url
+    os.environ['TURSO_AUTH_TOKEN'] = 'bench'
+    os.environ.pop('TURSO_REPLICA_PATH', None)
+    if args.no_cache:
+        os.environ['DB_CACHE_ENABLED'] = '0'
+    from app import create_app
+    flask_app = create_app()
+
+    results = []
+    try:
+        for scenario in scenarios:
+            if scenario == 'burst':
+                results.append(run_burst(flask_app, server, args.db, fixture, args.burst_size, args.seed))
+                continue
+            results.append(run_scenario(flask_app, server, scenario, fixture, args.requests,
+                                        args.concurrency, args.warmup, args.seed))
+    finally:
+        server.stop()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+    failed = [r['scenario'] for r in results if r['errors'] or r.get('double_booked_positions')]
+    if failed:
+        print(f"\nנכשלו: {', '.join(failed)}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+-- סכמת הבסיס של Basket Check לסביבת ה-benchmark.
+-- כוללת את העמודות שהקוד והתבניות משתמשים בהן; במסד האמיתי ב-Turso ייתכנו עמודות נוספות.
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    phone TEXT DEFAULT '',
+    user_type TEXT NOT NULL DEFAULT 'player',
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS positions (
+    position_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    position_name TEXT UNIQUE NOT NULL,
+    description TEXT,
+    max_per_game INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS games (
+    game_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    game_date TEXT NOT NULL,
+    game_time TEXT NOT NULL,
+    location TEXT NOT NULL,
+    max_players INTEGER NOT NULL DEFAULT 10,
+    created_by INTEGER NOT NULL REFERENCES users(user_id),
+    description TEXT DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'open',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS game_registrations (
+    registration_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_id INTEGER NOT NULL REFERENCES games(game_id),
+    user_id INTEGER NOT NULL REFERENCES users(user_id),
+    position_id INTEGER NOT NULL REFERENCES positions(position_id),
+    status TEXT NOT NULL DEFAULT 'confirmed',
+    registered_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
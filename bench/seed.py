@@ -0,0 +1,144 @@
+"""יצירת מסד נתונים לדוגמה לבדיקות ביצועים
+
+    python -m bench.seed --db bench.db --scale 10000
+
+scale הוא מספר המשחקים (100, 10000 או 1000000). מספר המשתמשים זהה לו,
+וכ-5 הרשמות לכל משחק פתוח. הנתונים דטרמיניסטיים לפי --seed.
+"""
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from migrate import SCHEMA_VERSION_TABLE, load_migrations
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'schema.sql')
+
+POSITIONS = [
+    f'Team {team} - {role}'
+    for team in ('A', 'B')
+    for role in ('Point Guard', 'Shooting Guard', 'Small Forward', 'Power Forward', 'Center')
+] + ['Referee', 'Scorekeeper', 'Substitute 1', 'Substitute 2']
+
+LOCATIONS = ['מגרש העירוני', 'אולם הספורט', 'פארק הירקון', 'מגרש בית הספר', 'המתנ"ס']
+
+# סיסמה אחידה לכל המשתמשים שנוצרים
+PASSWORD = 'bench123'
+
+BATCH = 10000
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(db_path, scale, seed_value=42, open_ratio=0.3, managers=None, migrations=True):
+    """יצירת הסכמה ומילוי הנתונים - מחזיר מילון עם מספר השורות בכל טבלה
+
+    migrations=False משאיר את הסכמה בלי המיגרציות (בלי האינדקסים), להשוואה.
+    """
+    rng = random.Random(seed_value)
+    managers = managers or max(1, scale // 100)
+    password_hash = hashlib.sha256(PASSWORD.encode()).hexdigest()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    with open(SCHEMA_PATH, encoding='utf-8') as f:
+        conn.executescript(f.read())
+
+    conn.executemany(
+        'INSERT INTO positions (position_name, description, max_per_game) VALUES (?, ?, 1)',
+        [(name, '') for name in POSITIONS]
+    )
+
+    users = (
+        (f'user{i}', f'user{i}@bench.local', password_hash, f'שחקן{i}', f'בדיקה{i}', '',
+         'manager' if i <= managers else 'player')
+        for i in range(1, scale + 1)
+    )
+    for batch in _batches(users):
+        conn.executemany(
+            'INSERT INTO users (username, email, password_hash, first_name, last_name, phone, user_type) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+
+    # משחקים - חלק פתוחים בעתיד, השאר היסטוריה שהושלמה
+    today = date.today()
+    open_games = []
+
+    def games():
+        for game_id in range(1, scale + 1):
+            is_open = rng.random() < open_ratio
+            offset = rng.randint(1, 60) if is_open else -rng.randint(1, 3650)
+            if is_open:
+                open_games.append(game_id)
+            yield (
+                f'משחק {game_id}', (today + timedelta(days=offset)).isoformat(),
+                f'{rng.randint(16, 22):02d}:{rng.choice(("00", "30"))}:00', rng.choice(LOCATIONS), 10,
+                rng.randint(1, managers), '', 'open' if is_open else 'completed'
+            )
+
+    for batch in _batches(games()):
+        conn.executemany(
+            'INSERT INTO games (title, game_date, game_time, location, max_players, created_by, description, status) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+
+    # הרשמות - עד 5 שחקנים שונים בעמדות שונות לכל משחק פתוח
+    def registrations():
+        for game_id in open_games:
+            count = rng.randint(0, 5)
+            user_ids = rng.sample(range(1, scale + 1), min(count, scale))
+            position_ids = rng.sample(range(1, len(POSITIONS) + 1), len(user_ids))
+            for user_id, position_id in zip(user_ids, position_ids):
+                yield (game_id, user_id, position_id)
+
+    for batch in _batches(registrations()):
+        conn.executemany(
+            'INSERT INTO game_registrations (game_id, user_id, position_id) VALUES (?, ?, ?)', batch)
+
+    # המיגרציות רצות אחרי המילוי - בניית אינדקס אחת מהירה מעדכון שלו בכל הכנסה
+    if migrations:
+        conn.execute(SCHEMA_VERSION_TABLE)
+        for version, name, statements in load_migrations():
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+
+    conn.commit()
+    counts = {
+        table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        for table in ('users', 'positions', 'games', 'game_registrations')
+    }
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='יצירת מסד נתונים לבדיקות ביצועים')
+    parser.add_argument('--db', required=True, help='קובץ SQLite ליצירה (נדרס אם קיים)')
+    parser.add_argument('--scale', type=int, default=100, help='מספר משחקים: 100, 10000 או 1000000')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-migrations', action='store_true', help='בלי המיגרציות (בלי אינדקסים)')
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+    started = time.perf_counter()
+    counts = seed(args.db, args.scale, args.seed, migrations=not args.no_migrations)
+    print(f"✅ נוצר {args.db} תוך {time.perf_counter() - started:.1f} שניות: {counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""שרת מקומי שמדבר את הפרוטוקול של Turso מעל קובץ SQLite
+
+מחליף את הענן בזמן benchmark: אותן בקשות HTTP (pipeline ב-/v2/pipeline),
+עם השהיה מלאכותית לכל בקשה כדי לדמות RTT.
+
+    python -m bench.turso_server --db bench.db --latency-ms 40 --jitter-ms 10
+"""
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from turso_transport import run_pipeline
+
+
+class StubTursoServer:
+    """שרת Turso מקומי - כל הבקשות רצות ברצף מול חיבור SQLite אחד, כמו primary יחיד"""
+
+    def __init__(self, db_path, host='127.0.0.1', port=0, latency_ms=0.0, jitter_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.requests = 0
+        self.statements = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._lock = threading.Lock()
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, כמו בענן
+            # כותרות וגוף נכתבים בנפרד - בלי NODELAY כל תגובה מחכה ל-delayed ACK (~40ms)
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                body = server.handle(self.path, payload)
+                server.delay()
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def handle(self, path, payload):
+        """תגובת ה-pipeline, או None לנתיב אחר"""
+        if not path.rstrip('/').endswith('/v2/pipeline'):
+            return None
+        with self._lock:
+            self.requests += 1
+            self.statements += sum(1 for r in payload.get('requests', []) if r.get('type') == 'execute')
+            return run_pipeline(self._conn, payload)
+
+    def delay(self):
+        """השהיית RTT מלאכותית - מחוץ לנעילה, כך שבקשות במקביל ממתינות במקביל"""
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='turso-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='שרת Turso מקומי מעל SQLite')
+    parser.add_argument('--db', required=True, help='קובץ SQLite (ראו bench.seed)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='השהיה לכל בקשה')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='סטייה אקראית מההשהיה')
+    args = parser.parse_args()
+
+    server = StubTursoServer(args.db, args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f"✅ שרת Turso מקומי: {server.url} (TURSO_DATABASE_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
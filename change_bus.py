@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import deque
+
+
+class ChangeBus:
+    """pub/sub בתוך התהליך לשינויים במשחקים ובהרשמות
+
+    כל אירוע מקבל מזהה עולה. האירועים האחרונים נשמרים בחוצץ, כך שלקוח
+    שהתנתק יכול להתחבר מחדש עם Last-Event-ID ולקבל את מה שפספס. הבאס
+    מקומי לתהליך - עם כמה workers כל אחד מכיר רק את הכתיבות שעברו דרכו.
+    """
+
+    def __init__(self, replay_size=512):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=replay_size)  # (id, topic, event, data)
+        self._last_id = 0
+        self._versions = {}  # topic -> מזהה האירוע האחרון
+        self.subscribers = 0
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, topic, event, data=None):
+        """פרסום אירוע לנושא (למשל 'game:5' או 'games') - מחזיר את מזהה האירוע"""
+        with self._condition:
+            self._last_id += 1
+            self._events.append((self._last_id, topic, event, data))
+            self._versions[topic] = self._last_id
+            self._condition.notify_all()
+            return self._last_id
+
+    def version(self, topic):
+        """מזהה האירוע האחרון בנושא (0 אם עוד לא היה)"""
+        return self._versions.get(topic, 0)
+
+    def versions(self):
+        """העתק של כל הגרסאות - לקריאה לפני טעינת נתונים שמתויגים לפיהן"""
+        with self._condition:
+            return dict(self._versions)
+
+    def events(self, topics, last_event_id=None, heartbeat=15.0, timeout=None):
+        """generator של אירועים (id, topic, event, data) בנושאים המבוקשים
+
+        מחזיר None כשעבר heartbeat בלי אירוע. אם last_event_id כבר לא בחוצץ,
+        האירוע הראשון הוא 'reset' והלקוח צריך לטעון הכל מחדש.
+        timeout מגביל את משך החיבור (הלקוח מתחבר מחדש עם Last-Event-ID).
+        """
+        topics = set(topics)
+        deadline = time.monotonic() + timeout if timeout else None
+        pending = []
+        with self._condition:
+            self.subscribers += 1
+            cursor = self._last_id
+            if last_event_id is not None and last_event_id != cursor:
+                oldest = self._events[0][0] if self._events else cursor + 1
+                if oldest - 1 <= last_event_id < cursor:
+                    cursor = last_event_id
+                else:
+                    pending.append((cursor, None, 'reset', None))
+
+        try:
+            last_output = time.monotonic()
+            while True:
+                for item in pending:
+                    yield item
+                    last_output = time.monotonic()
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    return
+                if now - last_output >= heartbeat:
+                    yield None
+                    last_output = now
+                wait = heartbeat - (now - last_output)
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                with self._condition:
+                    if self._last_id == cursor:
+                        self._condition.wait(max(0.0, wait))
+                    pending = [item for item in self._events if item[0] > cursor and item[1] in topics]
+                    cursor = self._last_id
+        finally:
+            with self._condition:
+                self.subscribers -= 1
+
+    def stats(self):
+        with self._condition:
+            return {
+                'last_id': self._last_id,
+                'buffered': len(self._events),
+                'subscribers': self.subscribers,
+                'topics': len(self._versions),
+            }
@@ -1,131 +1,449 @@
 import os
-import requests
+import sys
+import re
 import json
+import base64
+import time
+import functools
+import threading
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from turso_transport import PooledTransport, SQLiteTransport, encode_value, decode_value
+from query_cache import QueryCache
+from query_result import QueryResult, Row, column_index
+from replica import LocalReplica
+from db_metrics import metrics
+from slow_query_log import SlowQueryLog
+from group_commit import GroupCommit
+from change_bus import ChangeBus
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# פרסור זורם לתגובות גדולות - תלות אופציונלית
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# טקסט השאילתות נשמר פעם אחת לכל שאילתה של המחלקה (כולל IN לפי מספר הפרמטרים),
+# כך שהטקסט שנשלח לשרת יציב וה-statement cache שלו יכול לעבוד
+_interned_sql = {}
+
+def _intern_sql(query):
+    """החזרת הטקסט הקנוני (והמשותף) של שאילתה"""
+    sql = _interned_sql.get(query)
+    if sql is None:
+        sql = sys.intern(query.strip())
+        if len(_interned_sql) < 4096:
+            _interned_sql[query] = sql
+    return sql
+
+# עימוד keyset - גודל עמוד ברירת מחדל ומקסימלי
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+def encode_cursor(values):
+    """קידוד מפתח השורה האחרונה בעמוד ל-cursor שאפשר לשים ב-URL"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    """פענוח cursor - ValueError אם הוא לא תקין"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError("cursor לא תקין")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("cursor לא תקין")
+    return values
+
+def page_size(limit):
+    """גודל עמוד בגבולות המותרים"""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+@functools.lru_cache(maxsize=64)
+def _page_queries(template, cursor_condition):
+    """שתי גרסאות שאילתת העמוד (עם ובלי תנאי cursor) - נבנות פעם אחת"""
+    return template.format(cursor_condition=cursor_condition), template.format(cursor_condition="")
+
+class SQLError(Exception):
+    """שגיאת SQL של שאילתה אחת מתוך pipeline"""
+    
+    def __init__(self, message, code=None):
+        super().__init__(f"SQL Error: {message}")
+        self.message = message or ''
+        self.code = code
+
+# הודעות ההרשמה לפי האינדקס הייחודי שנפגע (migrations/0003)
+REGISTRATION_CONFLICTS = (
+    ('game_registrations.user_id', 'כבר נרשמת למשחק זה'),
+    ('game_registrations.position_id', 'הפוזיציה הזו כבר תפוסה'),
+)
+
+# קריאות בלי cache ובלי העותק המקומי - לבקשות של משתמש שכתב זה עתה (read-your-writes).
+# ה-cache מקומי לכל תהליך, והכתיבה ביטלה אותו רק ב-worker שביצע אותה
+_FRESH_READS = contextvars.ContextVar('db_fresh_reads', default=False)
+
 class DatabaseManager:
-    def __init__(self):
+    # זמן חיים (בשניות) לכל סוג תוצאה ב-cache
+    CACHE_TTLS = {
+        'positions': 3600,
+        'games': 30,
+        'games_with_counts': 15,
+        'game': 30,
+        'registrations': 10,
+        'games_by_creator': 30,
+        'manager_stats': 30,
+        'user': 60,
+    }
+    
+    def __init__(self, test_connection=True):
+        """test_connection=False - בלי פנייה לרשת ביצירה (החיבור נפתח בשאילתה הראשונה)"""
         self.turso_url = os.getenv('TURSO_DATABASE_URL')
         self.turso_token = os.getenv('TURSO_AUTH_TOKEN')
         
-        if not self.turso_url or not self.turso_token:
+        # file:/path/to/db.sqlite - קובץ SQLite מקומי במקום הענן (לבדיקות ופיתוח)
+        is_local = bool(self.turso_url) and self.turso_url.startswith('file:')
+        
+        if not self.turso_url or (not self.turso_token and not is_local):
             raise ValueError("חובה לספק TURSO_DATABASE_URL ו-TURSO_AUTH_TOKEN")
         
         # URL שעובד
         self.base_url = self.turso_url.replace('libsql://', 'https://')
         self.working_url = self.base_url  # נשתמש ישירות בURL הבסיסי
         
+        if is_local:
+            self.transport = SQLiteTransport(self.turso_url[len('file:'):])
+        else:
+            # חיבור HTTP משותף עם pool - נפתח פעם אחת ומשמש את כל ה-threads
+            # פרוטוקול ה-pipeline של Turso - פרמטרים מוקלדים בנפרד מטקסט השאילתה
+            self.transport = PooledTransport(
+                self.working_url.rstrip('/') + '/v2/pipeline',
+                self.turso_token,
+                pool_size=int(os.getenv('TURSO_POOL_SIZE', '10')),
+                http2=os.getenv('TURSO_HTTP2', '0') == '1',
+                connect_timeout=float(os.getenv('TURSO_CONNECT_TIMEOUT', '5')),
+                read_timeout=float(os.getenv('TURSO_READ_TIMEOUT', '30')),
+            )
+        
+        # cache לקריאות - מתבטל בכל כתיבה דרך המחלקה הזו.
+        # בין תהליכים שונים (כמה workers) ה-TTL הוא שחוסם את ההתיישנות
+        cache_size = int(os.getenv('DB_CACHE_SIZE', '1024'))
+        if os.getenv('DB_CACHE_ENABLED', '1') != '1':
+            cache_size = 0
+        self.cache = QueryCache(max_entries=cache_size)
+        
+        # עותק SQLite מקומי לקריאות (אופציונלי) - הכתיבות הולכות ל-primary
+        self.replica = None
+        replica_path = os.getenv('TURSO_REPLICA_PATH')
+        if replica_path:
+            self.replica = LocalReplica(
+                replica_path,
+                self.execute_batch,
+                max_staleness=float(os.getenv('TURSO_REPLICA_MAX_STALENESS', '5')),
+                # ה-hash של הסיסמאות לא נשמר בקובץ המקומי - האימות קורא מה-primary
+                private_columns={'users': ('password_hash',)},
+            )
+        
+        # threads להרצת שאילתות בלתי תלויות במקביל (gather)
+        self._fanout = ThreadPoolExecutor(
+            max_workers=int(os.getenv('DB_FANOUT_WORKERS', os.getenv('TURSO_POOL_SIZE', '10'))),
+            thread_name_prefix='db-fanout',
+        )
+        
+        # לוג שאילתות איטיות (DB_SLOW_QUERY_MS=0 מכבה)
+        self.slow_log = None
+        slow_query_ms = float(os.getenv('DB_SLOW_QUERY_MS', '200'))
+        if slow_query_ms > 0:
+            self.slow_log = SlowQueryLog(
+                os.getenv('DB_SLOW_QUERY_LOG', os.path.join('logs', 'slow_queries.log')),
+                threshold_ms=slow_query_ms,
+                explain=lambda stmt: self._send([{'type': 'execute', 'stmt': stmt}, {'type': 'close'}], 1)[0][0],
+                explain_top=int(os.getenv('DB_SLOW_QUERY_EXPLAIN_TOP', '5')),
+                explain_sample=float(os.getenv('DB_SLOW_QUERY_EXPLAIN_SAMPLE', '0.2')),
+            )
+        
+        # הרשמות שמגיעות יחד (פתיחת משחק) יוצאות לשרת ב-pipeline אחד
+        self._registrations = GroupCommit(
+            lambda statements: self.execute_batch(statements, raise_errors=False),
+            max_batch=int(os.getenv('DB_GROUP_COMMIT_MAX', '64')),
+            max_inflight=int(os.getenv('DB_GROUP_COMMIT_INFLIGHT', '4')),
+        )
+        
+        # שינויים במשחקים ובהרשמות - לעדכוני SSE לדפדפנים
+        self.changes = ChangeBus(replay_size=int(os.getenv('CHANGE_BUS_REPLAY', '512')))
+        
         print(f"✅ מתחבר ל-Turso: {self.working_url}")
-        self._test_connection()
+        if test_connection:
+            self._test_connection()
     
     def _test_connection(self):
         """בדוק שהחיבור עובד"""
         try:
-            result = self.execute_query("SELECT 1 as test")
+            self.ping()
             return True
         except Exception as e:
             print(f"❌ שגיאה בחיבור ל-Turso: {e}")
             raise
     
-    def execute_query(self, query, params=None):
-        """ביצוע שאילתה - טורסו לא תומך בפרמטרים דינמיים באAPI הזה"""
-        headers = {
-            'Authorization': f'Bearer {self.turso_token}',
-            'Content-Type': 'application/json',
-            'User-Agent': 'BasketCheck/1.0'
-        }
-        
-        # אם יש פרמטרים, נבנה שאילתה עם ערכים קשיחים
+    def ping(self):
+        """שאילתה ריקה לשרת (פותחת חיבור ב-pool) - מחזיר את זמן הסבב בשניות"""
+        started = time.perf_counter()
+        self.execute_query("SELECT 1 as test")
+        return time.perf_counter() - started
+    
+    def _statement(self, query, params=None):
+        """בניית stmt לפרוטוקול ה-pipeline - הפרמטרים נשלחים כ-args מוקלדים"""
+        stmt = {'sql': _intern_sql(query)}
         if params:
-            # המרה בטוחה של פרמטרים לשאילתה
-            safe_params = []
-            for param in params:
-                if param is None:
-                    safe_params.append("NULL")
-                elif isinstance(param, str):
-                    # escape single quotes
-                    escaped = param.replace("'", "''")
-                    safe_params.append(f"'{escaped}'")
-                elif isinstance(param, bool):
-                    safe_params.append("1" if param else "0")
-                else:
-                    safe_params.append(str(param))
-            
-            # החלף ? בערכים הבטוחים
-            final_query = query
-            for param in safe_params:
-                final_query = final_query.replace('?', param, 1)
+            stmt['args'] = [encode_value(param) for param in params]
+        return stmt
+    
+    def execute_query(self, query, params=None):
+        """ביצוע שאילתה בודדת"""
+        return self.execute_batch([(query, params)])[0]
+    
+    def execute_batch(self, statements, raise_errors=True, transaction=False):
+        """ביצוע כמה שאילתות בבקשת HTTP אחת - מחזיר תוצאה לכל שאילתה לפי הסדר
+        
+        כל איבר ב-statements הוא מחרוזת SQL או זוג (query, params).
+        השאילתות רצות ברצף על אותו חיבור בשרת, כך שכל שאילתה רואה את
+        השינויים של השאילתות שלפניה. עם raise_errors=False שאילתה שנכשלה
+        מקבלת SQLError במקום התוצאה שלה, ושאר התוצאות מוחזרות כרגיל.
+        
+        עם transaction=True השאילתות נשלחות כ-batch בין BEGIN ל-COMMIT: כל
+        שאילתה רצה רק אם הקודמת הצליחה, ואם אחת נכשלה הכל מבוטל (ROLLBACK).
+        """
+        stmts = [self._statement(statement) if isinstance(statement, str) else self._statement(*statement)
+                 for statement in statements]
+        if transaction:
+            pipeline = [{'type': 'batch', 'batch': {'steps': self._transaction_steps(stmts)}}, {'type': 'close'}]
         else:
-            final_query = query
+            pipeline = [{'type': 'execute', 'stmt': stmt} for stmt in stmts] + [{'type': 'close'}]
         
-        request_data = {
-            "statements": [final_query]
-        }
+        # fingerprint לקריאה - של השאילתה, או של ה-batch כולו (קריאה אחת = תצפית אחת)
+        fingerprint = metrics.batch_fingerprint(stmt['sql'] for stmt in stmts)
+        started = time.perf_counter()
         
         try:
-            response = requests.post(
-                self.working_url,
-                headers=headers,
-                json=request_data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_response(data)
-            else:
-                raise Exception(f"HTTP Error {response.status_code}: {response.text}")
-                
+            results, payload_bytes = self._send(pipeline, len(statements), raise_errors)
         except Exception as e:
-            print(f"שגיאה בשאילתה: {e}")
-            print(f"השאילתה הסופית: {final_query}")
+            metrics.record_query(fingerprint, time.perf_counter() - started, 0, 0, error=True)
+            logger.error("שגיאה בשאילתה: %s", e)
+            for stmt in stmts:
+                logger.error("השאילתה: %s", stmt['sql'])
+                logger.debug("פרמטרים: %s", stmt.get('args', []))
             raise
+        
+        elapsed = time.perf_counter() - started
+        metrics.record_query(fingerprint, elapsed,
+                             sum(len(result.rows) for result in results if isinstance(result, QueryResult)),
+                             payload_bytes)
+        if self.slow_log is not None:
+            self.slow_log.observe(stmts, elapsed, results, fingerprint)
+        return results
+    
+    @staticmethod
+    def _transaction_steps(stmts):
+        """צעדי batch לטרנזקציה: BEGIN, השאילתות בשרשרת, COMMIT ו-ROLLBACK אם COMMIT לא רץ"""
+        steps = [{'stmt': {'sql': 'BEGIN'}}]
+        for stmt in stmts:
+            steps.append({'stmt': stmt, 'condition': {'type': 'ok', 'step': len(steps) - 1}})
+        steps.append({'stmt': {'sql': 'COMMIT'}, 'condition': {'type': 'ok', 'step': len(steps) - 1}})
+        steps.append({'stmt': {'sql': 'ROLLBACK'},
+                      'condition': {'type': 'not', 'cond': {'type': 'ok', 'step': len(steps) - 1}}})
+        return steps
     
-    def _parse_response(self, data):
-        """פרסר תגובה מהשרת"""
-        class MockResult:
-            def __init__(self):
-                self.rows = []
-                self.last_insert_rowid = None
+    def _send(self, pipeline, count, raise_errors=True):
+        """שליחת pipeline לשרת בלי מדידה - מחזיר (תוצאות, גודל התגובה בבתים)"""
+        response = self.transport.post({
+            "requests": pipeline
+        })
         
-        result = MockResult()
+        if response.status_code != 200:
+            raise Exception(f"HTTP Error {response.status_code}: {response.text}")
         
-        # טורסו מחזיר פורמט: [{'results': {...}}]
-        if isinstance(data, list) and len(data) > 0:
-            first_item = data[0]
-            if 'results' in first_item:
-                results_data = first_item['results']
-                
-                if 'columns' in results_data and 'rows' in results_data:
-                    cols = results_data['columns']
-                    rows_data = results_data['rows']
-                    
-                    for row_data in rows_data:
-                        row_dict = {}
-                        for i, col in enumerate(cols):
-                            if i < len(row_data):
-                                row_dict[col] = row_data[i]
-                        result.rows.append(row_dict)
-                
-                # לפעמים יש last_insert_rowid ברמה העליונה
-                if 'last_insert_rowid' in results_data:
-                    result.last_insert_rowid = results_data['last_insert_rowid']
+        results = self._parse_response(response.json(), raise_errors)
+        if len(results) != count:
+            raise Exception(f"מספר התוצאות ({len(results)}) לא תואם למספר השאילתות ({count})")
+        return results, len(getattr(response, 'content', b'') or b'')
+    
+    def _read_query(self, query, params=None):
+        """שאילתת קריאה - מהעותק המקומי אם הוא מוגדר ועדכני, אחרת מה-primary. מחזיר שורות"""
+        if self.replica is not None and not _FRESH_READS.get():
+            try:
+                if self.replica.ensure_fresh():
+                    return self.replica.query(query, params)
+            except Exception as e:
+                logger.warning("⚠️ שגיאה בעותק המקומי, קורא מה-primary: %s", e)
+        return self.execute_query(query, params).rows
+    
+    def _refresh_replica(self, table, where, params):
+        """משיכת השורות שהשתנו לעותק המקומי אחרי כתיבה"""
+        if self.replica is None:
+            return
+        try:
+            self.replica.refresh(table, where, params)
+        except Exception as e:
+            # העותק כבר לא אמין - הקריאות הולכות ל-primary עד הסנכרון הבא
+            logger.warning("⚠️ שגיאה בעדכון העותק המקומי: %s", e)
+            self.replica.last_sync = None
+    
+    def slow_query_stats(self):
+        """השאילתות האיטיות לפי fingerprint (None אם הלוג כבוי)"""
+        return self.slow_log.stats() if self.slow_log is not None else None
+    
+    def replica_stats(self):
+        """מצב העותק המקומי (None אם הוא לא מוגדר)"""
+        return self.replica.stats() if self.replica is not None else None
+    
+    def _cached(self, key, loader):
+        """קריאה דרך ה-cache - key[0] קובע את ה-TTL"""
+        return self.cache.get_or_load(key, self.CACHE_TTLS[key[0]], loader, reload=_FRESH_READS.get())
+    
+    def set_fresh_reads(self, enabled=True):
+        """קריאות הבקשה הנוכחית עוקפות את ה-cache והעותק המקומי - מחזיר token ל-reset_fresh_reads"""
+        return _FRESH_READS.set(enabled)
+    
+    def reset_fresh_reads(self, token):
+        _FRESH_READS.reset(token)
+    
+    def cache_stats(self):
+        """סטטיסטיקות ה-cache של השאילתות"""
+        return self.cache.stats()
+    
+    def gather(self, *calls):
+        """הרצת כמה קריאות בלתי תלויות במקביל - מחזיר את התוצאות לפי הסדר
         
-        return result
+        כל קריאה היא tuple של (method, *args), למשל:
+        game, positions = db.gather((db.get_game_by_id, 5), (db.get_all_positions,))
+        כך זמן העמוד הוא זמן השאילתה האיטית ולא סכום השאילתות.
+        """
+        # קריאה מתוך thread של ה-fanout רצה ברצף, כדי לא לחכות לעצמנו
+        if len(calls) < 2 or threading.current_thread().name.startswith('db-fanout'):
+            return [call[0](*call[1:]) for call in calls]
+        
+        # כל קריאה רצה עם ה-context של הבקשה, כדי שהמדידה שלה תיזקף לבקשה
+        futures = [self._fanout.submit(contextvars.copy_context().run, *call) for call in calls]
+        return [future.result() for future in futures]
+    
+    def group_commit_stats(self):
+        """סטטיסטיקות איחוד ההרשמות"""
+        return self._registrations.stats()
+    
+    def pool_stats(self):
+        """סטטיסטיקות ה-pool של חיבורי ה-HTTP"""
+        return self.transport.stats()
+    
+    def _parse_response(self, data, raise_errors=True):
+        """פרסר תגובה מהשרת - תוצאה אחת לכל שאילתה"""
+        results = []
+        
+        # טורסו מחזיר פורמט: {'results': [{'type': 'ok', 'response': {...}}, {'type': 'error', ...}, ...]}
+        for item in data.get('results', []):
+            if item['type'] == 'error':
+                error = SQLError(item['error'].get('message'), item['error'].get('code'))
+                if raise_errors:
+                    raise error
+                results.append(error)
+                continue
+            
+            response = item['response']
+            if response['type'] == 'batch':
+                results.extend(self._parse_transaction(response['result'], raise_errors))
+            elif response['type'] == 'execute':
+                results.append(self._query_result(response['result']))
+        
+        return results
+    
+    @staticmethod
+    def _query_result(results_data):
+        last_insert_rowid = results_data.get('last_insert_rowid')
+        return QueryResult.from_values(
+            [col['name'] for col in results_data['cols']],
+            [tuple(map(decode_value, row)) for row in results_data['rows']],
+            last_insert_rowid=int(last_insert_rowid) if last_insert_rowid is not None else None,
+            rows_affected=results_data.get('affected_row_count'),
+        )
+    
+    def _parse_transaction(self, batch, raise_errors=True):
+        """תוצאות השאילתות של batch מ-_transaction_steps (בלי BEGIN/COMMIT/ROLLBACK)"""
+        step_results, step_errors = batch['step_results'], batch.get('step_errors') or []
+        step_errors = step_errors + [None] * (len(step_results) - len(step_errors))
+        if step_results[-2] is not None:
+            return [self._query_result(result) for result in step_results[1:-2]]
+        
+        # הטרנזקציה בוטלה - השגיאה הראשונה (גם של BEGIN או COMMIT) היא הסיבה
+        error = next((error for error in step_errors if error is not None), {'message': 'הטרנזקציה בוטלה'})
+        error = SQLError(error.get('message'), error.get('code'))
+        if raise_errors:
+            raise error
+        return [error] * (len(step_results) - 3)
+    
+    def iter_query(self, query, params=None):
+        """שאילתה עם פרסור זורם - השורות נבנות תוך כדי קריאת התגובה
+        
+        מתאים לתוצאות גדולות. דורש את החבילה ijson ו-HTTP/1.1; אחרת התגובה
+        נטענת במלואה כמו ב-execute_query.
+        """
+        if ijson is None or not getattr(self.transport, 'supports_stream', False):
+            yield from self.execute_query(query, params).rows
+            return
+        
+        request_data = {'requests': [{'type': 'execute', 'stmt': self._statement(query, params)}, {'type': 'close'}]}
+        prefix_result = 'results.item.response.result'
+        with self.transport.post_stream(request_data) as response:
+            if response.status_code != 200:
+                raise Exception(f"HTTP Error {response.status_code}: {response.text}")
+            
+            columns = []
+            index = None
+            pending = []  # שורות שהגיעו לפני רשימת העמודות
+            row = value = key = None
+            for prefix, event, data in ijson.parse(response.raw, use_float=True):
+                if prefix == 'results.item.error.message':
+                    raise Exception(f"SQL Error: {data}")
+                elif prefix == prefix_result + '.cols.item.name':
+                    columns.append(data)
+                elif prefix == prefix_result + '.cols' and event == 'end_array':
+                    index = column_index(columns)
+                    for values in pending:
+                        yield Row(values, index)
+                    pending = []
+                elif prefix == prefix_result + '.rows.item':
+                    if event == 'start_array':
+                        row = []
+                    elif event == 'end_array':
+                        if index is None:
+                            pending.append(tuple(row))
+                        else:
+                            yield Row(tuple(row), index)
+                elif prefix == prefix_result + '.rows.item.item':
+                    if event == 'start_map':
+                        value = {}
+                    elif event == 'end_map':
+                        row.append(decode_value(value))
+                    elif event == 'map_key':
+                        key = data
+                elif prefix.startswith(prefix_result + '.rows.item.item.') and value is not None:
+                    value[key] = data
     
     def get_all_games(self, status=None):
         """קבלת כל המשחקים"""
         try:
             if status:
                 query = "SELECT * FROM games WHERE status = ? ORDER BY game_date, game_time"
-                result = self.execute_query(query, (status,))
+                return self._cached(('games', status), lambda: self._read_query(query, (status,)))
             else:
                 query = "SELECT * FROM games ORDER BY game_date, game_time"
-                result = self.execute_query(query)
-            
-            return result.rows if result and result.rows else []
+                return self._cached(('games', None), lambda: self._read_query(query))
         except Exception as e:
             return []
     
@@ -133,10 +451,10 @@ class DatabaseManager:
         """קבלת משחק לפי ID"""
         try:
             query = "SELECT * FROM games WHERE game_id = ?"
-            result = self.execute_query(query, (game_id,))
+            rows = self._cached(('game', game_id), lambda: self._read_query(query, (game_id,)))
             
-            if result and result.rows:
-                return result.rows[0]
+            if rows:
+                return rows[0]
             return None
         except Exception as e:
             return None
@@ -152,19 +470,247 @@ class DatabaseManager:
             WHERE gr.game_id = ? AND gr.status = 'confirmed'
             ORDER BY p.position_name
             """
-            result = self.execute_query(query, (game_id,))
+            return self._cached(('registrations', game_id), lambda: self._read_query(query, (game_id,)))
+        except Exception as e:
+            return []
+    
+    def get_games_with_counts(self, status='open'):
+        """קבלת משחקים עם מספר הנרשמים והמקומות הפנויים - בשאילתה אחת"""
+        try:
+            # available_spots = 10 פחות מספר השחקנים בעמדות Team A / Team B
+            query = """
+            SELECT g.*,
+                   COALESCE(rc.registrations_count, 0) AS registrations_count,
+                   10 - COALESCE(rc.team_players, 0) AS available_spots
+            FROM games g
+            LEFT JOIN (
+                SELECT gr.game_id,
+                       COUNT(*) AS registrations_count,
+                       SUM(CASE WHEN substr(p.position_name, 1, 6) IN ('Team A', 'Team B') THEN 1 ELSE 0 END) AS team_players
+                FROM game_registrations gr
+                JOIN users u ON gr.user_id = u.user_id
+                JOIN positions p ON gr.position_id = p.position_id
+                WHERE gr.status = 'confirmed'
+                  AND gr.game_id IN (SELECT game_id FROM games WHERE status = ?)
+                GROUP BY gr.game_id
+            ) rc ON rc.game_id = g.game_id
+            WHERE g.status = ?
+            ORDER BY g.game_date, g.game_time
+            """
+            return self._cached(('games_with_counts', status),
+                                lambda: self._read_query(query, (status, status)))
+        except Exception as e:
+            return []
+    
+    def get_registrations_for_games(self, game_ids):
+        """קבלת הרשמות לכמה משחקים בשאילתה אחת - מחזיר מילון game_id -> רשימת הרשמות"""
+        registrations = {}
+        missing = []
+        
+        # משחקים שההרשמות שלהם כבר ב-cache לא נשלפים שוב
+        generation = self.cache.generation
+        for game_id in game_ids:
+            cached = None if _FRESH_READS.get() else self.cache.get(('registrations', game_id))
+            if cached is None:
+                missing.append(game_id)
+            else:
+                registrations[game_id] = cached
+        
+        if not missing:
+            return registrations
+        
+        try:
+            placeholders = ', '.join('?' for _ in missing)
+            query = f"""
+            SELECT gr.*, u.first_name, u.last_name, u.username, p.position_name
+            FROM game_registrations gr
+            JOIN users u ON gr.user_id = u.user_id
+            JOIN positions p ON gr.position_id = p.position_id
+            WHERE gr.game_id IN ({placeholders}) AND gr.status = 'confirmed'
+            ORDER BY gr.game_id, p.position_name
+            """
+            rows = self._read_query(query, tuple(missing))
             
-            return result.rows if result and result.rows else []
+            fetched = {game_id: [] for game_id in missing}
+            for row in rows:
+                fetched.setdefault(row['game_id'], []).append(row)
+            
+            # שמירה ב-cache לכל משחק בנפרד, כך שביטול של משחק אחד מדויק
+            ttl = self.CACHE_TTLS['registrations']
+            for game_id, rows in fetched.items():
+                self.cache.set(('registrations', game_id), rows, ttl, generation)
+                registrations[game_id] = [row.copy() for row in rows]
+            return registrations
+        except Exception as e:
+            for game_id in missing:
+                registrations[game_id] = []
+            return registrations
+    
+    def get_games_by_creator(self, user_id, limit=None, offset=0):
+        """קבלת המשחקים שמנהל יצר עם מספר הנרשמים - סינון, ספירה ו-LIMIT בשאילתה"""
+        try:
+            query = """
+            SELECT g.*, COALESCE(rc.registrations_count, 0) AS registrations_count
+            FROM games g
+            LEFT JOIN (
+                SELECT gr.game_id, COUNT(*) AS registrations_count
+                FROM game_registrations gr
+                JOIN users u ON gr.user_id = u.user_id
+                JOIN positions p ON gr.position_id = p.position_id
+                WHERE gr.status = 'confirmed'
+                  AND gr.game_id IN (SELECT game_id FROM games WHERE created_by = ?)
+                GROUP BY gr.game_id
+            ) rc ON rc.game_id = g.game_id
+            WHERE g.created_by = ?
+            ORDER BY g.game_date, g.game_time
+            LIMIT ? OFFSET ?
+            """
+            # LIMIT -1 ב-SQLite פירושו ללא הגבלה
+            params = (user_id, user_id, -1 if limit is None else limit, offset)
+            return self._cached(('games_by_creator', user_id, limit, offset),
+                                lambda: self._read_query(query, params))
         except Exception as e:
             return []
     
+    def _keyset_page(self, key, template, cursor_condition, params, cursor, limit, key_columns):
+        """הרצת שאילתת עמוד - מחזיר (שורות, cursor לעמוד הבא או None)
+        
+        ב-template מופיע {cursor_condition}: בעמוד הראשון הוא ריק, ובשאר
+        העמודים ערכי ה-cursor נשלחים אחרי params. ה-LIMIT הוא הפרמטר האחרון.
+        מבקשים שורה אחת יותר מהעמוד כדי לדעת אם יש עמוד הבא.
+        """
+        query, first_query = _page_queries(template, cursor_condition)
+        limit = page_size(limit)
+        if cursor:
+            args = tuple(params) + tuple(decode_cursor(cursor, len(key_columns))) + (limit + 1,)
+            rows = self._cached(key + (cursor, limit), lambda: self._read_query(query, args))
+        else:
+            args = tuple(params) + (limit + 1,)
+            rows = self._cached(key + (None, limit), lambda: self._read_query(first_query, args))
+        
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1][col] for col in key_columns)
+    
+    def get_games_page(self, status='open', cursor=None, limit=None, search=None):
+        """עמוד של משחקים עם ספירות הנרשמים - keyset על (game_date, game_time, game_id)
+        
+        search מסנן לפי כותרת או מיקום (בכל המשחקים, לא רק בעמוד הנוכחי).
+        """
+        template = """
+        WITH page AS (
+            SELECT * FROM games
+            WHERE status = ? {search_condition} {cursor_condition}
+            ORDER BY game_date, game_time, game_id
+            LIMIT ?
+        )
+        SELECT page.*,
+               COALESCE(rc.registrations_count, 0) AS registrations_count,
+               10 - COALESCE(rc.team_players, 0) AS available_spots
+        FROM page
+        LEFT JOIN (
+            SELECT gr.game_id,
+                   COUNT(*) AS registrations_count,
+                   SUM(CASE WHEN substr(p.position_name, 1, 6) IN ('Team A', 'Team B') THEN 1 ELSE 0 END) AS team_players
+            FROM game_registrations gr
+            JOIN users u ON gr.user_id = u.user_id
+            JOIN positions p ON gr.position_id = p.position_id
+            WHERE gr.status = 'confirmed' AND gr.game_id IN (SELECT game_id FROM page)
+            GROUP BY gr.game_id
+        ) rc ON rc.game_id = page.game_id
+        ORDER BY page.game_date, page.game_time, page.game_id
+        """
+        params = (status,)
+        search_condition = ""
+        if search:
+            pattern = '%' + re.sub(r'([\\%_])', r'\\\1', search) + '%'
+            search_condition = "AND (title LIKE ? ESCAPE '\\' OR location LIKE ? ESCAPE '\\')"
+            params += (pattern, pattern)
+        return self._keyset_page(
+            ('games_with_counts', status, 'page', search or None),
+            template.replace('{search_condition}', search_condition),
+            "AND (game_date, game_time, game_id) > (?, ?, ?)",
+            params, cursor, limit, ('game_date', 'game_time', 'game_id'),
+        )
+    
+    def get_games_by_creator_page(self, user_id, cursor=None, limit=None):
+        """עמוד של המשחקים שמנהל יצר - keyset על (game_date, game_time, game_id)"""
+        template = """
+        WITH page AS (
+            SELECT * FROM games
+            WHERE created_by = ? {cursor_condition}
+            ORDER BY game_date, game_time, game_id
+            LIMIT ?
+        )
+        SELECT page.*, COALESCE(rc.registrations_count, 0) AS registrations_count
+        FROM page
+        LEFT JOIN (
+            SELECT gr.game_id, COUNT(*) AS registrations_count
+            FROM game_registrations gr
+            JOIN users u ON gr.user_id = u.user_id
+            JOIN positions p ON gr.position_id = p.position_id
+            WHERE gr.status = 'confirmed' AND gr.game_id IN (SELECT game_id FROM page)
+            GROUP BY gr.game_id
+        ) rc ON rc.game_id = page.game_id
+        ORDER BY page.game_date, page.game_time, page.game_id
+        """
+        return self._keyset_page(
+            ('games_by_creator', user_id, 'page'),
+            template, "AND (game_date, game_time, game_id) > (?, ?, ?)",
+            (user_id,), cursor, limit, ('game_date', 'game_time', 'game_id'),
+        )
+    
+    def get_game_registrations_page(self, game_id, cursor=None, limit=None):
+        """עמוד של הרשמות למשחק - keyset על (position_name, registration_id)"""
+        template = """
+        SELECT gr.*, u.first_name, u.last_name, u.username, p.position_name
+        FROM game_registrations gr
+        JOIN users u ON gr.user_id = u.user_id
+        JOIN positions p ON gr.position_id = p.position_id
+        WHERE gr.game_id = ? AND gr.status = 'confirmed' {cursor_condition}
+        ORDER BY p.position_name, gr.registration_id
+        LIMIT ?
+        """
+        return self._keyset_page(
+            ('registrations', game_id, 'page'),
+            template, "AND (p.position_name, gr.registration_id) > (?, ?)",
+            (game_id,), cursor, limit, ('position_name', 'registration_id'),
+        )
+    
+    def get_manager_stats(self, user_id):
+        """סטטיסטיקות לוח הבקרה של מנהל - שאילתה אחת"""
+        try:
+            query = """
+            SELECT
+                (SELECT COUNT(*) FROM games WHERE created_by = ?) AS total_games,
+                (SELECT COUNT(*) FROM games WHERE created_by = ? AND status = 'open') AS open_games,
+                (SELECT COUNT(*)
+                 FROM game_registrations gr
+                 JOIN games g ON gr.game_id = g.game_id
+                 JOIN users u ON gr.user_id = u.user_id
+                 JOIN positions p ON gr.position_id = p.position_id
+                 WHERE g.created_by = ? AND gr.status = 'confirmed') AS total_registrations
+            """
+            rows = self._cached(('manager_stats', user_id),
+                                lambda: self._read_query(query, (user_id, user_id, user_id)))
+            
+            if rows:
+                row = rows[0]
+                return {
+                    'total_games': row['total_games'] or 0,
+                    'open_games': row['open_games'] or 0,
+                    'total_registrations': row['total_registrations'] or 0
+                }
+        except Exception as e:
+            pass
+        return {'total_games': 0, 'open_games': 0, 'total_registrations': 0}
+    
     def get_all_positions(self):
         """קבלת כל הפוזיציות"""
         try:
             query = "SELECT * FROM positions ORDER BY position_id"
-            result = self.execute_query(query)
-            
-            return result.rows if result and result.rows else []
+            return self._cached(('positions',), lambda: self._read_query(query))
         except Exception as e:
             return []
     
@@ -175,10 +721,10 @@ class DatabaseManager:
         
         try:
             query = "SELECT * FROM users WHERE username = ? AND password_hash = ? AND is_active = 1"
-            result = self.execute_query(query, (username, password_hash))
+            rows = self.execute_query(query, (username, password_hash)).rows
             
-            if result and result.rows:
-                return result.rows[0]
+            if rows:
+                return rows[0]
             return None
         except Exception as e:
             return None
@@ -187,10 +733,10 @@ class DatabaseManager:
         """קבלת משתמש לפי שם משתמש"""
         try:
             query = "SELECT * FROM users WHERE username = ?"
-            result = self.execute_query(query, (username,))
+            rows = self._cached(('user', username), lambda: self._read_query(query, (username,)))
             
-            if result and result.rows:
-                return result.rows[0]
+            if rows:
+                return rows[0]
             return None
         except Exception as e:
             return None
@@ -206,6 +752,8 @@ class DatabaseManager:
             VALUES (?, ?, ?, ?, ?, ?, 'player')
             """
             result = self.execute_query(query, (username, email, password_hash, first_name, last_name, phone))
+            self.cache.invalidate('user', username)
+            self._refresh_replica('users', 'username = ?', (username,))
             if result and result.last_insert_rowid:
                 return result.last_insert_rowid
             return None
@@ -215,44 +763,60 @@ class DatabaseManager:
     def create_game(self, title, game_date, game_time, location, created_by, description='', max_players=10):
         """יצירת משחק חדש"""
         try:
+            # RETURNING מחזיר את המזהה באותה בקשה, גם כשהשרת לא מחזיר last_insert_rowid
             query = """
             INSERT INTO games (title, game_date, game_time, location, max_players, created_by, description)
             VALUES (?, ?, ?, ?, ?, ?, ?)
+            RETURNING game_id
             """
             result = self.execute_query(query, (title, game_date, game_time, location, max_players, created_by, description))
-            if result and result.last_insert_rowid:
-                return result.last_insert_rowid
-            return None
+            game_id = None
+            if result and result.rows:
+                game_id = result.rows[0]['game_id']
+            elif result and result.last_insert_rowid:
+                game_id = result.last_insert_rowid
+            if game_id:
+                self._refresh_replica('games', 'game_id = ?', (game_id,))
+            self._invalidate_games(created_by)
+            if game_id:
+                self.changes.publish('games', 'game_created', {'game_id': game_id})
+            return game_id
         except Exception as e:
             return None
     
     def register_to_game(self, game_id, user_id, position_id):
-        """הרשמה למשחק"""
+        """הרשמה למשחק - INSERT מותנה יחיד, והאינדקסים הייחודיים כקו הגנה שני
+        
+        ההכנסה רצה רק אם השחקן לא רשום והעמדה פנויה. אם שתי הרשמות במקביל
+        עוברות את התנאי, האינדקסים הייחודיים (migrations/0003) דוחים את
+        השנייה. הכתיבה עוברת דרך ה-GroupCommit.
+        """
         try:
-            # בדוק אם כבר נרשם
-            check_query = "SELECT * FROM game_registrations WHERE game_id = ? AND user_id = ?"
-            existing = self.execute_query(check_query, (game_id, user_id))
-            
-            if existing and existing.rows:
-                return {'success': False, 'message': 'כבר נרשמת למשחק זה'}
-            
-            # בדוק אם הפוזיציה תפוסה
-            pos_check_query = "SELECT * FROM game_registrations WHERE game_id = ? AND position_id = ? AND status = 'confirmed'"
-            pos_taken = self.execute_query(pos_check_query, (game_id, position_id))
-            
-            if pos_taken and pos_taken.rows:
-                return {'success': False, 'message': 'הפוזיציה הזו כבר תפוסה'}
-            
-            # הרשם
             insert_query = """
             INSERT INTO game_registrations (game_id, user_id, position_id)
-            VALUES (?, ?, ?)
+            SELECT ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM game_registrations WHERE game_id = ? AND user_id = ?)
+              AND NOT EXISTS (SELECT 1 FROM game_registrations WHERE game_id = ? AND position_id = ? AND status = 'confirmed')
             """
-            result = self.execute_query(insert_query, (game_id, user_id, position_id))
-            if result:
+            result = self._registrations.submit(
+                (insert_query, (game_id, user_id, position_id, game_id, user_id, game_id, position_id)))
+            
+            if isinstance(result, SQLError):
+                for column, message in REGISTRATION_CONFLICTS:
+                    if 'UNIQUE' in result.message and column in result.message:
+                        return {'success': False, 'message': message}
+            if isinstance(result, Exception):
+                raise result
+            
+            if result.rows_affected != 0:
+                self._invalidate_registrations(game_id)
                 return {'success': True, 'message': 'נרשמת בהצלחה למשחק!'}
-            else:
-                return {'success': False, 'message': 'שגיאה בהרשמה'}
+            
+            # התנאי חסם את ההכנסה - בודקים איזה מהם (רק במסלול הנדיר הזה)
+            check_query = "SELECT 1 FROM game_registrations WHERE game_id = ? AND user_id = ?"
+            if self.execute_query(check_query, (game_id, user_id)).rows:
+                return {'success': False, 'message': 'כבר נרשמת למשחק זה'}
+            return {'success': False, 'message': 'הפוזיציה הזו כבר תפוסה'}
                 
         except Exception as e:
             return {'success': False, 'message': f'שגיאה: {str(e)}'}
@@ -262,9 +826,30 @@ class DatabaseManager:
         try:
             query = "DELETE FROM game_registrations WHERE game_id = ? AND user_id = ?"
             result = self.execute_query(query, (game_id, user_id))
+            self._invalidate_registrations(game_id)
             return True
         except Exception as e:
             return False
+    
+    def _invalidate_games(self, created_by):
+        """ביטול ה-cache אחרי יצירת משחק"""
+        self.cache.invalidate('games')
+        self.cache.invalidate('games_with_counts')
+        self.cache.invalidate('games_by_creator', created_by)
+        self.cache.invalidate('manager_stats', created_by)
+    
+    def _invalidate_registrations(self, game_id):
+        """ביטול ה-cache אחרי שינוי בהרשמות של משחק, והודעה למנויים על השינוי"""
+        self._refresh_replica('game_registrations', 'game_id = ?', (game_id,))
+        self.cache.invalidate('registrations', game_id)
+        self.cache.invalidate('games_with_counts')
+        # ספירות הנרשמים אצל היוצר של המשחק (המשחק עצמו בדרך כלל כבר ב-cache)
+        game = self.get_game_by_id(game_id)
+        creator = (game['created_by'],) if game is not None else ()
+        self.cache.invalidate('games_by_creator', *creator)
+        self.cache.invalidate('manager_stats', *creator)
+        self.changes.publish(f'game:{game_id}', 'registrations', {'game_id': game_id})
+        self.changes.publish('games', 'registrations', {'game_id': game_id})
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,216 @@
+import contextvars
+import hashlib
+import re
+import threading
+from bisect import bisect_left
+
+# גבולות ה-buckets של ההיסטוגרמות (בשניות)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+
+class Histogram:
+    """היסטוגרמה בפורמט Prometheus - counts מצטברים לפי bucket, sum ו-count"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class RequestStats:
+    """מצטבר השאילתות של בקשת HTTP אחת"""
+
+    __slots__ = ('queries', 'db_time', 'rows', 'payload_bytes', 'render_time', 'lock')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.payload_bytes = 0
+        self.render_time = 0.0
+        # שאילתות של אותה בקשה יכולות לרוץ במקביל (DatabaseManager.gather)
+        self.lock = threading.Lock()
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """צורה קנונית של שאילתה - בלי ליטרלים, רשימות IN מכווצות ורווחים אחידים"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?...)', sql)
+    return ' '.join(sql.split())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class DBMetrics:
+    """מדידת שאילתות ובקשות - היסטוגרמות לפי fingerprint של שאילתה ולפי route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fingerprints = {}  # sql -> fingerprint
+        self._fingerprint_sql = {}  # fingerprint -> sql
+        self._queries = {}  # fingerprint -> [Histogram, rows, bytes, errors]
+        self._routes = {}  # route -> [latency Histogram, db time Histogram, db count Histogram]
+        self._current = contextvars.ContextVar('db_request_stats', default=None)
+
+    def fingerprint(self, sql):
+        """מזהה קצר ויציב לשאילתה - אותו מזהה לכל השאילתות עם אותה צורה קנונית"""
+        fp = self._fingerprints.get(sql)
+        if fp is None:
+            normalized = normalize_sql(sql)
+            fp = hashlib.sha1(normalized.encode()).hexdigest()[:10]
+            with self._lock:
+                if len(self._fingerprints) < 4096:
+                    self._fingerprints[sql] = fp
+                self._fingerprint_sql[fp] = normalized
+        return fp
+
+    def batch_fingerprint(self, sqls):
+        """מזהה לקריאה אחת עם כמה שאילתות - לפי הצורות השונות שבה, בלי תלות במספר החזרות
+
+        לשאילתה אחת זה ה-fingerprint שלה. batch של N הכנסות זהות מקבל אותו
+        מזהה כמו batch של הכנסה אחת, כך שמספר התוויות לא גדל עם N.
+        """
+        parts = list(dict.fromkeys(self.fingerprint(sql) for sql in sqls))
+        if len(parts) == 1:
+            return parts[0]
+        fp = 'b' + hashlib.sha1('+'.join(parts).encode()).hexdigest()[:9]
+        if fp not in self._fingerprint_sql:
+            with self._lock:
+                self._fingerprint_sql[fp] = ' ; '.join(self._fingerprint_sql.get(part, '') for part in parts)
+        return fp
+
+    def fingerprint_sql(self, fingerprint):
+        """הטקסט הקנוני של fingerprint"""
+        return self._fingerprint_sql.get(fingerprint)
+
+    def record_query(self, fingerprint, seconds, rows, payload_bytes, error=False):
+        """רישום קריאה אחת למסד הנתונים (בקשת HTTP אחת, גם אם יש בה כמה שאילתות)"""
+        with self._lock:
+            entry = self._queries.get(fingerprint)
+            if entry is None:
+                entry = self._queries[fingerprint] = [Histogram(LATENCY_BUCKETS), 0, 0, 0]
+            entry[0].observe(seconds)
+            entry[1] += rows
+            entry[2] += payload_bytes
+            if error:
+                entry[3] += 1
+
+        stats = self._current.get()
+        if stats is not None:
+            with stats.lock:
+                stats.queries += 1
+                stats.db_time += seconds
+                stats.rows += rows
+                stats.payload_bytes += payload_bytes
+
+    def start_request(self):
+        """פתיחת מצטבר לבקשה הנוכחית - מחזיר את המצטבר ו-token ל-finish_request"""
+        stats = RequestStats()
+        return stats, self._current.set(stats)
+
+    def current(self):
+        return self._current.get()
+
+    def finish_request(self, token, route, seconds):
+        """סגירת הבקשה ורישום שלה בהיסטוגרמות של ה-route"""
+        stats = self._current.get()
+        try:
+            self._current.reset(token)
+        except ValueError:
+            # ה-token נוצר ב-context אחר - מספיק לנקות את הערך
+            self._current.set(None)
+        if stats is None:
+            return None
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = [
+                    Histogram(LATENCY_BUCKETS), Histogram(LATENCY_BUCKETS), Histogram(COUNT_BUCKETS)]
+            entry[0].observe(seconds)
+            entry[1].observe(stats.db_time)
+            entry[2].observe(stats.queries)
+        return stats
+
+    def render_prometheus(self):
+        """כל המדדים בפורמט הטקסט של Prometheus"""
+        with self._lock:
+            queries = {fp: (entry[0], entry[1], entry[2], entry[3]) for fp, entry in self._queries.items()}
+            routes = dict(self._routes)
+            sql_by_fp = dict(self._fingerprint_sql)
+
+            lines = [
+                '# HELP db_query_duration_seconds Latency of database calls by statement fingerprint.',
+                '# TYPE db_query_duration_seconds histogram',
+            ]
+            for fp, (histogram, _, _, _) in sorted(queries.items()):
+                lines.extend(histogram.render('db_query_duration_seconds', f'fingerprint="{fp}"'))
+
+            lines.append('# HELP db_query_rows_total Rows returned by statement fingerprint.')
+            lines.append('# TYPE db_query_rows_total counter')
+            for fp, (_, rows, _, _) in sorted(queries.items()):
+                lines.append(f'db_query_rows_total{{fingerprint="{fp}"}} {rows}')
+
+            lines.append('# HELP db_query_payload_bytes_total Response payload bytes by statement fingerprint.')
+            lines.append('# TYPE db_query_payload_bytes_total counter')
+            for fp, (_, _, payload, _) in sorted(queries.items()):
+                lines.append(f'db_query_payload_bytes_total{{fingerprint="{fp}"}} {payload}')
+
+            lines.append('# HELP db_query_errors_total Failed database calls by statement fingerprint.')
+            lines.append('# TYPE db_query_errors_total counter')
+            for fp, (_, _, _, errors) in sorted(queries.items()):
+                lines.append(f'db_query_errors_total{{fingerprint="{fp}"}} {errors}')
+
+            lines.append('# HELP db_query_info Statement text for each fingerprint.')
+            lines.append('# TYPE db_query_info gauge')
+            for fp in sorted(queries):
+                if fp in sql_by_fp:
+                    lines.append(f'db_query_info{{fingerprint="{fp}",sql="{_escape(sql_by_fp[fp])}"}} 1')
+
+            lines.append('# HELP http_request_duration_seconds Request latency by route.')
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for route, entry in sorted(routes.items()):
+                lines.extend(entry[0].render('http_request_duration_seconds', f'route="{_escape(route)}"'))
+
+            lines.append('# HELP http_request_db_seconds Database time per request by route.')
+            lines.append('# TYPE http_request_db_seconds histogram')
+            for route, entry in sorted(routes.items()):
+                lines.extend(entry[1].render('http_request_db_seconds', f'route="{_escape(route)}"'))
+
+            lines.append('# HELP http_request_db_queries Database calls per request by route.')
+            lines.append('# TYPE http_request_db_queries histogram')
+            for route, entry in sorted(routes.items()):
+                lines.extend(entry[2].render('http_request_db_queries', f'route="{_escape(route)}"'))
+
+        return '\n'.join(lines) + '\n'
+
+
+# מופע יחיד לכל התהליך
+metrics = DBMetrics()
@@ -0,0 +1,90 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _size(value):
+    """זיכרון משוער של ערך - מחרוזת או tuple של מחרוזות ומספרים"""
+    if isinstance(value, tuple):
+        return sum(sys.getsizeof(part) for part in value)
+    return sys.getsizeof(value)
+
+
+class FragmentCache:
+    """cache ל-HTML מרונדר - LRU מוגבל בזיכרון (בתים) עם TTL
+
+    המפתחות כוללים את גרסת הנתונים (ChangeBus) ואת מה שתלוי במשתמש, כך
+    שכתיבה יוצרת מפתח חדש והרשומות הישנות יוצאות ב-LRU או ב-TTL.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=15.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """הערך השמור או None"""
+        if self.max_bytes <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if self.max_bytes <= 0:
+            return
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_render(self, key, render, reload=False):
+        """הערך השמור, או render() שנשמר (reload=True מרנדר תמיד)"""
+        value = None if reload else self.get(key)
+        if value is None:
+            value = render()
+            self.set(key, value)
+        return value
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,91 @@
+import threading
+
+
+class _Pending:
+    __slots__ = ('statement', 'event', 'result', 'lead', 'batch')
+
+    def __init__(self, statement):
+        self.statement = statement
+        self.event = threading.Event()
+        self.result = None
+        self.lead = False
+        self.batch = None
+
+
+class GroupCommit:
+    """איחוד כתיבות מכמה threads לבקשת pipeline אחת לשרת
+
+    עד max_inflight קוראים שולחים בעצמם (leaders) ומצרפים את מה שבתור. מי
+    שמגיע כשכל ה-leaders ממתינים לשרת נכנס לתור, וה-batch הבא יוצא ברגע שאחד
+    מהם חוזר - בלי השהיה מלאכותית. בעומס נמוך כל כתיבה יוצאת לבד; בפרץ הן
+    יוצאות יחד, RTT אחד לכל batch.
+
+    execute מקבל רשימת statements ומחזיר תוצאה לכל אחד (או את השגיאה שלו).
+    """
+
+    def __init__(self, execute, max_batch=64, max_inflight=4):
+        self._execute = execute
+        self.max_batch = max_batch
+        self.max_inflight = max_inflight
+        self._lock = threading.Lock()
+        self._queue = []
+        self._leaders = 0
+        self.batches = 0
+        self.statements = 0
+        self.max_seen = 0
+
+    def submit(self, statement):
+        """הוספת statement לתור והמתנה לתוצאה שלו"""
+        pending = _Pending(statement)
+        with self._lock:
+            lead = self._leaders < self.max_inflight
+            if lead:
+                self._leaders += 1
+                batch = [pending] + self._queue[:self.max_batch - 1]
+                del self._queue[:self.max_batch - 1]
+            else:
+                self._queue.append(pending)
+
+        if not lead:
+            pending.event.wait()
+            if not pending.lead:
+                return pending.result
+            # קיבלנו את ההובלה - ה-batch כבר הוצא מהתור בשבילנו
+            batch = pending.batch
+
+        try:
+            results = self._execute([item.statement for item in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for item, result in zip(batch, results):
+            item.result = result
+
+        with self._lock:
+            self.batches += 1
+            self.statements += len(batch)
+            self.max_seen = max(self.max_seen, len(batch))
+            if self._queue:
+                # העברת ההובלה לבא בתור, יחד עם ה-batch שלו
+                successor = self._queue[0]
+                successor.lead = True
+                successor.batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+                successor.event.set()
+            else:
+                self._leaders -= 1
+
+        for item in batch:
+            if item is not pending:
+                item.event.set()
+        return pending.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'statements': self.statements,
+                'avg_batch': round(self.statements / self.batches, 2) if self.batches else 0.0,
+                'max_batch': self.max_seen,
+                'queued': len(self._queue),
+                'inflight': self._leaders,
+            }
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+from database import DatabaseManager
+
+
+class LazyDatabaseManager:
+    """DatabaseManager שנוצר בשימוש הראשון ומתחמם ברקע
+
+    טעינת המודול ויצירת המופע לא ניגשות לרשת, כך ש-worker עולה גם כש-Turso
+    איטי או לא זמין. warm_up() מריץ ברקע שאילתת ping (עם ניסיונות חוזרים)
+    שפותחת את החיבור הראשון ב-pool, ו-status() מדווח אם החימום הצליח.
+
+        db = LazyDatabaseManager()
+        db.warm_up()
+        db.get_game_by_id(5)  # יוצר את ה-DatabaseManager אם עוד לא נוצר
+    """
+
+    def __init__(self, factory=None, retry_interval=1.0, max_retry_interval=30.0):
+        self._factory = factory or (lambda: DatabaseManager(test_connection=False))
+        self._db = None
+        self._lock = threading.Lock()
+        self._warmer = None
+        self._warmer_pid = None
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.ready = False
+        self.attempts = 0
+        self.error = None
+        self.ping_ms = None
+        self.warm_up_ms = None
+
+    @property
+    def instance(self):
+        """ה-DatabaseManager עצמו - נוצר בקריאה הראשונה"""
+        db = self._db
+        if db is None:
+            with self._lock:
+                if self._db is None:
+                    self._db = self._factory()
+                db = self._db
+        return db
+
+    def __getattr__(self, name):
+        return getattr(self.instance, name)
+
+    def warm_up(self):
+        """התחלת החימום ב-thread ברקע (פעם אחת בכל תהליך - גם אחרי fork של gunicorn)"""
+        with self._lock:
+            if self._warmer is None or self._warmer_pid != os.getpid():
+                self._warmer_pid = os.getpid()
+                self._warmer = threading.Thread(target=self._warm, name='db-warm-up', daemon=True)
+                self._warmer.start()
+        return self._warmer
+
+    def _warm(self):
+        started = time.monotonic()
+        delay = self.retry_interval
+        while True:
+            self.attempts += 1
+            try:
+                self.ping_ms = round(self.instance.ping() * 1000, 2)
+                self.error = None
+                self.warm_up_ms = round((time.monotonic() - started) * 1000, 2)
+                self.ready = True
+                return
+            except Exception as e:
+                self.error = str(e)
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_interval)
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'created': self._db is not None,
+            'attempts': self.attempts,
+            'ping_ms': self.ping_ms,
+            'warm_up_ms': self.warm_up_ms,
+            'error': self.error,
+        }
@@ -0,0 +1,224 @@
+"""מיגרציות של סכמת מסד הנתונים
+
+    python migrate.py status        # גרסאות שהורצו וגרסאות ממתינות
+    python migrate.py up [--to N]   # הרצת המיגרציות הממתינות
+    python migrate.py check         # EXPLAIN QUERY PLAN על השאילתות של DatabaseManager
+
+כל מיגרציה היא קובץ migrations/NNNN_name.sql. הפקודות ורישום הגרסה רצים
+בטרנזקציה אחת: אם פקודה נכשלה, שום דבר מהמיגרציה לא נשמר והגרסה לא נרשמת.
+הגרסאות שהורצו נשמרות בטבלה schema_version.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+
+from query_cache import QueryCache
+from slow_query_log import full_scans
+from turso_transport import _LocalResponse, decode_value
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+_MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+def split_statements(script):
+    """פיצול קובץ SQL לפקודות בודדות"""
+    statements = []
+    current = ''
+    for line in script.splitlines(keepends=True):
+        if not current and (not line.strip() or line.strip().startswith('--')):
+            continue
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ''
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """כל המיגרציות לפי הסדר - רשימת (version, name, statements)"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            migrations.append((int(match.group(1)), match.group(2), split_statements(f.read())))
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"מספר גרסה כפול ב-{directory}")
+    return migrations
+
+
+def applied_versions(db):
+    """הגרסאות שכבר הורצו - מילון version -> applied_at"""
+    db.execute_query(SCHEMA_VERSION_TABLE)
+    rows = db.execute_query("SELECT version, applied_at FROM schema_version ORDER BY version").rows
+    return {row['version']: row['applied_at'] for row in rows}
+
+
+def migrate(db, target=None):
+    """הרצת המיגרציות שעוד לא הורצו (עד target אם צוין) - מחזיר את הגרסאות שהורצו"""
+    applied = applied_versions(db)
+    done = []
+    for version, name, statements in load_migrations():
+        if version in applied or (target is not None and version > target):
+            continue
+        # הפקודות ורישום הגרסה בבקשה אחת לשרת, בטרנזקציה אחת
+        db.execute_batch(statements + [
+            ("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name)),
+        ], transaction=True)
+        done.append(version)
+    return done
+
+
+def status(db):
+    """רשימת כל המיגרציות עם מצב ההרצה שלהן"""
+    applied = applied_versions(db)
+    return [
+        {'version': version, 'name': name, 'applied_at': applied.get(version)}
+        for version, name, _ in load_migrations()
+    ]
+
+
+# קריאות ל-DatabaseManager שהבדיקה מריצה - (method, args).
+# הכתיבות לא מתבצעות באמת: כל שאילתה מוחלפת ב-EXPLAIN QUERY PLAN
+CHECKED_CALLS = [
+    ('get_all_games', ('open',)),
+    ('get_game_by_id', (1,)),
+    ('get_game_registrations', (1,)),
+    ('get_games_with_counts', ('open',)),
+    ('get_registrations_for_games', ([1, 2, 3],)),
+    ('get_games_by_creator', (1,)),
+    ('get_games_by_creator', (1, 5)),
+    ('get_games_page', ('open',)),
+    ('get_games_page', ('open', None, None, 'check')),
+    ('get_games_by_creator_page', (1,)),
+    ('get_game_registrations_page', (1,)),
+    ('get_manager_stats', (1,)),
+    ('get_user_by_username', ('check',)),
+    ('authenticate_user', ('check', 'check')),
+    ('register_to_game', (1, 1, 1)),
+    ('cancel_registration', (1, 1)),
+    # קריאות מכוונות של טבלה שלמה
+    ('get_all_positions', ()),
+    ('get_all_games', (None,)),
+]
+
+# טבלאות שמותר לסרוק במלואן בקריאה מסוימת
+FULL_SCAN_ALLOWLIST = {
+    'get_all_positions': {'positions'},
+    'get_all_games': {'games'},
+}
+
+_TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|ORDER\b|GROUP\b)(\w+))?',
+                          re.IGNORECASE)
+
+
+def _aliases(sql):
+    """מפת alias -> שם טבלה לפי ה-FROM/JOIN של השאילתה"""
+    aliases = {}
+    for table, alias in _TABLE_ALIAS.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+class _ExplainTransport:
+    """transport שמחליף כל שאילתה ב-EXPLAIN QUERY PLAN שלה ומחזיר תוצאה ריקה"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.plans = []  # (sql, [detail, ...])
+
+    def post(self, payload):
+        executes = [request['stmt'] for request in payload['requests'] if request['type'] == 'execute']
+        explain = [{'type': 'execute', 'stmt': dict(stmt, sql='EXPLAIN QUERY PLAN ' + stmt['sql'])}
+                   for stmt in executes]
+        response = self.transport.post({'requests': explain + [{'type': 'close'}]})
+        for stmt, item in zip(executes, response.json()['results']):
+            if item['type'] == 'error':
+                raise Exception(f"SQL Error: {item['error'].get('message')}")
+            detail = [col['name'] for col in item['response']['result']['cols']].index('detail')
+            self.plans.append((stmt['sql'], [decode_value(row[detail]) for row in item['response']['result']['rows']]))
+
+        empty = {'cols': [], 'rows': [], 'affected_row_count': 0, 'last_insert_rowid': None}
+        return _LocalResponse({'results': [
+            {'type': 'ok', 'response': {'type': 'execute', 'result': empty}} for _ in executes
+        ] + [{'type': 'ok', 'response': {'type': 'close'}}]})
+
+
+def check(db):
+    """EXPLAIN QUERY PLAN על השאילתות של DatabaseManager - מחזיר רשימת סריקות מלאות אסורות"""
+    tables = {row['name'] for row in db.execute_query(
+        "SELECT name FROM sqlite_master WHERE type = 'table'").rows}
+
+    original = db.transport, db.cache, db.replica, db.slow_log
+    explain = _ExplainTransport(db.transport)
+    db.transport, db.cache, db.replica, db.slow_log = explain, QueryCache(0), None, None
+    problems = []
+    try:
+        for method, args in CHECKED_CALLS:
+            explain.plans = []
+            getattr(db, method)(*args)
+            if not explain.plans:
+                problems.append({'call': method, 'sql': None, 'tables': [], 'plan': ['no query captured']})
+            for sql, plan in explain.plans:
+                aliases = _aliases(sql)
+                scanned = {aliases.get(name, name) for name in full_scans(plan)} & tables
+                scanned -= FULL_SCAN_ALLOWLIST.get(method, set())
+                if scanned:
+                    problems.append({'call': method, 'sql': ' '.join(sql.split()),
+                                     'tables': sorted(scanned), 'plan': plan})
+    finally:
+        db.transport, db.cache, db.replica, db.slow_log = original
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='מיגרציות של סכמת מסד הנתונים')
+    commands = parser.add_subparsers(dest='command', required=True)
+    up = commands.add_parser('up', help='הרצת המיגרציות הממתינות')
+    up.add_argument('--to', type=int, help='גרסת יעד')
+    commands.add_parser('status', help='מצב המיגרציות')
+    commands.add_parser('check', help='בדיקת סריקות מלאות בשאילתות')
+    args = parser.parse_args()
+
+    from database import DatabaseManager
+    db = DatabaseManager()
+
+    if args.command == 'up':
+        done = migrate(db, args.to)
+        print(f"✅ הורצו {len(done)} מיגרציות: {done}" if done else "✅ הסכמה מעודכנת")
+    elif args.command == 'status':
+        for migration in status(db):
+            state = migration['applied_at'] or 'ממתינה'
+            print(f"{migration['version']:04d} {migration['name']:<40} {state}")
+    elif args.command == 'check':
+        problems = check(db)
+        for problem in problems:
+            print(f"❌ {problem['call']}: סריקה מלאה של {', '.join(problem['tables'])}")
+            print(f"   {problem['sql']}")
+            for detail in problem['plan']:
+                print(f"   - {detail}")
+        if problems:
+            return 1
+        print(f"✅ אין סריקות מלאות ב-{len(CHECKED_CALLS)} הקריאות שנבדקו")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
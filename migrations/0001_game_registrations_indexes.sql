@@ -0,0 +1,9 @@
+-- אינדקסים לשאילתות ההרשמות: הרשמות למשחק, בדיקת הרשמה כפולה ובדיקת עמדה תפוסה
+CREATE INDEX IF NOT EXISTS idx_game_registrations_game_status
+    ON game_registrations (game_id, status);
+
+CREATE INDEX IF NOT EXISTS idx_game_registrations_game_user
+    ON game_registrations (game_id, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_game_registrations_game_position_status
+    ON game_registrations (game_id, position_id, status);
@@ -0,0 +1,6 @@
+-- אינדקסים לרשימות המשחקים: לפי סטטוס ולפי יוצר המשחק, בסדר התצוגה
+CREATE INDEX IF NOT EXISTS idx_games_status_date
+    ON games (status, game_date, game_time);
+
+CREATE INDEX IF NOT EXISTS idx_games_created_by_date
+    ON games (created_by, game_date, game_time);
@@ -0,0 +1,49 @@
+-- אכיפת ההרשמה במסד הנתונים: שחקן אחד פעם אחת לכל משחק, ועמדה מאושרת אחת לכל משחק.
+-- ה-INSERT המותנה של register_to_game נשען על האינדקסים האלה כקו הגנה שני תחת עומס
+
+-- הרשמות כפולות שנוצרו לפני האכיפה: נשארת ההרשמה הראשונה (MIN(registration_id))
+-- של כל שחקן במשחק ושל כל עמדה מאושרת במשחק. השאר עוברות ל-game_registrations_dupes
+-- עם הסיבה, כך שאפשר לבדוק אותן ולהחזיר הרשמה ידנית
+CREATE TABLE IF NOT EXISTS game_registrations_dupes (
+    registration_id INTEGER PRIMARY KEY,
+    game_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    position_id INTEGER NOT NULL,
+    status TEXT,
+    registered_at TEXT,
+    reason TEXT NOT NULL,
+    removed_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO game_registrations_dupes (registration_id, game_id, user_id, position_id, status, registered_at, reason)
+SELECT registration_id, game_id, user_id, position_id, status, registered_at, 'duplicate_user'
+FROM game_registrations
+WHERE registration_id NOT IN (
+    SELECT MIN(registration_id) FROM game_registrations GROUP BY game_id, user_id
+);
+
+DELETE FROM game_registrations
+WHERE registration_id IN (SELECT registration_id FROM game_registrations_dupes);
+
+INSERT INTO game_registrations_dupes (registration_id, game_id, user_id, position_id, status, registered_at, reason)
+SELECT registration_id, game_id, user_id, position_id, status, registered_at, 'duplicate_position'
+FROM game_registrations
+WHERE status = 'confirmed'
+  AND registration_id NOT IN (
+    SELECT MIN(registration_id) FROM game_registrations
+    WHERE status = 'confirmed'
+    GROUP BY game_id, position_id
+);
+
+DELETE FROM game_registrations
+WHERE registration_id IN (SELECT registration_id FROM game_registrations_dupes);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_game_registrations_game_user
+    ON game_registrations (game_id, user_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_game_registrations_game_position_confirmed
+    ON game_registrations (game_id, position_id)
+    WHERE status = 'confirmed';
+
+-- האינדקס הייחודי מחליף את האינדקס הרגיל מ-0001
+DROP INDEX IF EXISTS idx_game_registrations_game_user;
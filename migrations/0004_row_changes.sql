@@ -0,0 +1,74 @@
+-- יומן שינויים לעותק המקומי (replica.py): כל הכנסה, עדכון או מחיקה בטבלאות
+-- שהאפליקציה קוראת מעדכנים שורה אחת לכל (table_name, row_id) עם version חדש.
+-- העותק מושך רק את השורות שה-version שלהן גדול מהסנכרון הקודם, כולל עדכונים
+-- ו-rowid שנמחק ונוצר מחדש. ביומן שורה אחת לכל rowid, לא שורה לכל שינוי
+CREATE TABLE IF NOT EXISTS row_changes (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    UNIQUE (table_name, row_id)
+);
+
+CREATE TRIGGER IF NOT EXISTS row_changes_users_insert AFTER INSERT ON users
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('users', NEW.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_users_update AFTER UPDATE ON users
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('users', OLD.rowid);
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('users', NEW.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_users_delete AFTER DELETE ON users
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('users', OLD.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_positions_insert AFTER INSERT ON positions
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('positions', NEW.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_positions_update AFTER UPDATE ON positions
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('positions', OLD.rowid);
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('positions', NEW.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_positions_delete AFTER DELETE ON positions
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('positions', OLD.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_games_insert AFTER INSERT ON games
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('games', NEW.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_games_update AFTER UPDATE ON games
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('games', OLD.rowid);
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('games', NEW.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_games_delete AFTER DELETE ON games
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('games', OLD.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_game_registrations_insert AFTER INSERT ON game_registrations
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('game_registrations', NEW.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_game_registrations_update AFTER UPDATE ON game_registrations
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('game_registrations', OLD.rowid);
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('game_registrations', NEW.rowid);
+END;
+
+CREATE TRIGGER IF NOT EXISTS row_changes_game_registrations_delete AFTER DELETE ON game_registrations
+BEGIN
+    INSERT OR REPLACE INTO row_changes (table_name, row_id) VALUES ('game_registrations', OLD.rowid);
+END;
@@ -0,0 +1,103 @@
+# batching.py
+"""Micro-batching for model calls made by concurrent requests.
+
+Request threads call submit(item) and block. A single worker thread takes the
+first waiting item, collects whatever else arrives within max_wait seconds (up
+to max_batch items), runs one process(items) call and hands each result back
+to its caller. Under load a batch fills while the previous one runs, so the
+number of model calls grows with batches, not with requests.
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _Request:
+    __slots__ = ("item", "done", "result", "error")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        process: Callable[[List[Any]], List[Any]],
+        max_batch: int = 16,
+        max_wait: float = 0.005,
+        name: str = "micro-batcher",
+    ):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+
+    def submit(self, item: Any) -> Any:
+        """Process one item as part of a batch; raises what the batch call raised."""
+        if self.max_batch <= 1:
+            return self.process([item])[0]
+        request = _Request(item)
+        self._start()
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _start(self) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[_Request]) -> None:
+        try:
+            results = self.process([request.item for request in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: {len(results)} results for {len(batch)} items")
+            for request, result in zip(batch, results):
+                request.result = result
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        finally:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest = max(self.largest, len(batch))
+            for request in batch:
+                request.done.set()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize(),
+        }
@@ -5,6 +5,8 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_ollama import OllamaEmbeddings
 from langchain_community.vectorstores import Chroma
 
+from semantic_cache import write_ingest_marker
+
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "data", "pdfs")
 DB_DIR   = os.path.join(BASE_DIR, "db", "chroma")
@@ -33,6 +35,8 @@ def main():
         collection_name="basketball_rules",
     )
     vectordb.persist()
+    # The running chatbot server drops its cached answers when the marker changes
+    write_ingest_marker(DB_DIR, len(chunks))
     print(f"Ingested {len(chunks)} chunks into {DB_DIR}")
 
 if __name__ == "__main__":
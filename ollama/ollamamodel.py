@@ -1,10 +1,16 @@
 # app.py
 from __future__ import annotations
+import json
 import os
-from typing import List
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from langchain_ollama import ChatOllama, OllamaEmbeddings
@@ -13,42 +19,78 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 
-# Optional reranker (improves precision of top-k)
+from batching import MicroBatcher
+from semantic_cache import SemanticCache
+
+# Optional reranker (improves precision of top-k); the model is loaded by warm_up()
 try:
     from flashrank import Ranker, RerankRequest
     RERANK = True
-    ranker = Ranker(model_name="BAAI/bge-reranker-v2-m3")  # multilingual, fast
 except Exception:
     RERANK = False
-    ranker = None
+ranker = None
 
 # ---------- Paths & constants ----------
 BASE_DIR = os.path.dirname(__file__)
 DB_DIR   = os.path.join(BASE_DIR, "db", "chroma")     # <project>/ollama/db/chroma
 BASE_URL = "http://127.0.0.1:11434"                   # Ollama default
 COLLECTION = "basketball_rules"
+RETRIEVE_K = 8
 
-# Ensure vector DB exists (ingest.py should have created it)
-if not os.path.exists(DB_DIR) or not os.listdir(DB_DIR):
-    raise RuntimeError(
-        f"Vector DB not found or empty at {DB_DIR}. "
-        "Run ingestion first: `py ingest.py` from the ollama folder."
-    )
+# How long /chat waits for the warm-up before answering 503
+# (keep well under the Flask proxy's 30s timeout)
+CHAT_READY_TIMEOUT = float(os.getenv("CHAT_READY_TIMEOUT", "10"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "256"))  # 0 disables
+
+# Semantic answer cache: near-duplicate questions reuse a stored answer
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", os.path.join(BASE_DIR, "db", "semantic_cache.json"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # cosine similarity
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "500"))  # 0 disables
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Micro-batching of embed calls across concurrent requests (1 disables)
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT = float(os.getenv("BATCH_MAX_WAIT_MS", "5")) / 1000
 
 # ---------- Embeddings via Ollama ----------
 emb = OllamaEmbeddings(model="nomic-embed-text", base_url=BASE_URL)
 
-# ---------- Vector store & retriever ----------
-vectordb = Chroma(
-    persist_directory=DB_DIR,
-    embedding_function=emb,
-    collection_name=COLLECTION,
-)
-# similarity is fine; switch to search_type="mmr" for more diversity
-retriever = vectordb.as_retriever(search_kwargs={"k": 8})
+# Questions from concurrent requests share one embed_documents call
+# (embed_query is embed_documents on a single text, so the vectors are the same)
+embed_batcher = MicroBatcher(emb.embed_documents, BATCH_MAX_SIZE, BATCH_MAX_WAIT, name="embed-batcher")
+
+def embed_question(question: str) -> List[float]:
+    return embed_batcher.submit(question)
+
+# ---------- Vector store (opened by warm_up()) ----------
+vectordb: Optional[Chroma] = None
+
+def load_reranker():
+    global RERANK, ranker
+    if not RERANK:
+        return
+    try:
+        ranker = Ranker(model_name="BAAI/bge-reranker-v2-m3")  # multilingual, fast
+    except Exception:
+        RERANK = False
+
+def open_vectordb():
+    global vectordb
+    # Ensure vector DB exists (ingest.py should have created it)
+    if not os.path.exists(DB_DIR) or not os.listdir(DB_DIR):
+        raise RuntimeError(
+            f"Vector DB not found or empty at {DB_DIR}. "
+            "Run ingestion first: `py ingest.py` from the ollama folder."
+        )
+    vectordb = Chroma(
+        persist_directory=DB_DIR,
+        embedding_function=emb,
+        collection_name=COLLECTION,
+    )
 
 def rerank(query: str, docs):
-    if not RERANK or not docs:
+    if not RERANK or ranker is None or not docs:
         return docs
     req = RerankRequest(query=query, passages=[d.page_content for d in docs])
     scores = ranker.rerank(req)  # sorted by relevance desc
@@ -63,9 +105,83 @@ def format_docs(docs) -> str:
         lines.append(f"[{i+1}] {d.page_content}\nSOURCE: {src} | page {page}")
     return "\n\n".join(lines)
 
-def retrieve(query: str):
-    docs = retriever.get_relevant_documents(query)
-    return rerank(query, docs)
+# ---------- Retrieval cache ----------
+def normalize_question(question: str) -> str:
+    # Case, whitespace and trailing punctuation don't change the retrieval
+    return " ".join(question.casefold().split()).rstrip(" ?!.,;:")
+
+class RetrievalCache:
+    """Bounded LRU of reranked docs per normalized question."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            docs = self._entries.get(key)
+            if docs is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return docs
+
+    def put(self, key: str, docs) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = docs
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+retrieval_cache = RetrievalCache(RETRIEVAL_CACHE_SIZE)
+
+def retrieve(query: str, vector=None):
+    # embed + vector search + rerank, skipped for questions seen recently.
+    # With the question's vector (from the semantic cache) the embed is skipped too
+    key = normalize_question(query)
+    docs = retrieval_cache.get(key)
+    if docs is None:
+        if vector is None:
+            vector = embed_question(query)
+        found = vectordb.similarity_search_by_vector(list(map(float, vector)), k=RETRIEVE_K)
+        # Not batched: flashrank scores one query per call, so a batch would only
+        # queue requests behind each other on one thread
+        docs = rerank(query, found)
+        retrieval_cache.put(key, docs)
+    return docs
+
+semantic_cache = SemanticCache(
+    embed_question,
+    path=SEMANTIC_CACHE_PATH,
+    db_dir=DB_DIR,
+    model=emb.model,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    max_entries=SEMANTIC_CACHE_SIZE,
+    ttl=SEMANTIC_CACHE_TTL,
+)
+# A re-ingest invalidates retrieved docs as well as answers
+semantic_cache.on_invalidate.append(retrieval_cache.clear)
 
 SYSTEM = """You are a basketball rules assistant. Prefer official sources (FIBA/NBA/WNBA).
 - Distinguish between FIBA vs NBA when relevant.
@@ -88,18 +204,84 @@ llm = ChatOllama(
 )
 
 # ---------- RAG chain ----------
-rag_chain = (
-    {
-        "question": RunnablePassthrough(),
-        "context": RunnableLambda(retrieve) | RunnableLambda(format_docs),
-    }
-    | prompt
-    | llm
-    | StrOutputParser()
+# {"question", "vector"?} -> {..., "docs", "answer"}: one retrieval feeds both the
+# prompt context and the sources returned to the client
+answer_chain = prompt | llm | StrOutputParser()
+
+rag_chain = RunnablePassthrough.assign(
+    docs=RunnableLambda(lambda x: retrieve(x["question"], x.get("vector"))),
+).assign(
+    answer=RunnableLambda(lambda x: {"question": x["question"], "context": format_docs(x["docs"])})
+    | answer_chain,
 )
 
+# ---------- Warm-up ----------
+# Runs in a background thread at startup so /health answers at once. Each stage
+# is retried until it succeeds (Ollama or the ingest may still be starting).
+class WarmupState:
+    def __init__(self):
+        self.stage = "starting"
+        self.timings: Dict[str, float] = {}  # stage -> ms
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.ready = threading.Event()
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready.is_set(),
+            "stage": self.stage,
+            "timings_ms": self.timings,
+            "attempts": self.attempts,
+            "error": self.error,
+        }
+
+warmup = WarmupState()
+
+# Same model as llm, one token is enough to load it into Ollama's memory
+warmup_llm = ChatOllama(model=llm.model, base_url=BASE_URL, num_predict=1)
+
+WARMUP_STAGES = [
+    ("reranker", load_reranker),
+    ("vectordb", open_vectordb),
+    ("embed", lambda: emb.embed_query("warm up")),
+    ("generate", lambda: warmup_llm.invoke("hi")),
+]
+
+def warm_up():
+    started = time.perf_counter()
+    for stage, step in WARMUP_STAGES:
+        warmup.stage = stage
+        stage_started = time.perf_counter()
+        while True:
+            warmup.attempts += 1
+            try:
+                step()
+                break
+            except Exception as e:
+                warmup.error = f"{stage}: {e}"
+                time.sleep(WARMUP_RETRY_SECONDS)
+        warmup.error = None
+        warmup.timings[stage] = round((time.perf_counter() - stage_started) * 1000, 1)
+    warmup.timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    warmup.stage = "ready"
+    warmup.ready.set()
+
+def require_ready():
+    if not warmup.ready.wait(CHAT_READY_TIMEOUT):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Warming up (stage: {warmup.stage})",
+            headers={"Retry-After": str(int(WARMUP_RETRY_SECONDS))},
+        )
+
 # ---------- FastAPI ----------
-app = FastAPI(title="Basketball RAG (Ollama + Chroma)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=warm_up, name="rag-warm-up", daemon=True).start()
+    yield
+    semantic_cache.save()
+
+app = FastAPI(title="Basketball RAG (Ollama + Chroma)", lifespan=lifespan)
 
 # CORS (adjust origins for prod)
 app.add_middleware(
@@ -115,17 +297,81 @@ class ChatRequest(BaseModel):
 
 @app.get("/health")
 def health():
-    try:
-        count = vectordb._collection.count()  # type: ignore
-        return {"status": "ok", "docs": int(count)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Liveness only - answers while the models are still loading
+    result = {"status": "ok", "stage": warmup.stage}
+    if vectordb is not None:
+        try:
+            result["docs"] = int(vectordb._collection.count())  # type: ignore
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return result
+
+@app.get("/ready")
+def ready():
+    state = warmup.as_dict()
+    if not state["ready"]:
+        return JSONResponse(status_code=503, content=state)
+    return state
+
+@app.get("/stats")
+def stats():
+    return {
+        "retrieval_cache": retrieval_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "embed_batcher": embed_batcher.stats(),
+    }
+
+def sources_of(docs) -> List[dict]:
+    return [{"source": d.metadata.get("source",""), "page": d.metadata.get("page")} for d in docs[:4]]
 
 @app.post("/chat")
 def chat(req: ChatRequest):
     if not req.question or not req.question.strip():
         raise HTTPException(status_code=400, detail="Empty question")
-    answer = rag_chain.invoke(req.question)
-    top_docs = retrieve(req.question)[:4] or []
-    sources = [{"source": d.metadata.get("source",""), "page": d.metadata.get("page")} for d in top_docs]
+    require_ready()
+    cached, vector = semantic_cache.lookup(req.question)
+    if cached is not None:
+        return cached
+    result = rag_chain.invoke({"question": req.question, "vector": vector})
+    answer = result["answer"]
+    sources = sources_of(result["docs"])
+    semantic_cache.store(req.question, vector, answer, sources)
     return {"answer": answer, "sources": sources}
+
+def ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+@app.post("/chat/stream")
+def chat_stream(req: ChatRequest):
+    """Same as /chat, streamed as NDJSON lines while the model generates:
+    {"type": "token", "text"}... then {"type": "done", "sources"} (or {"type": "error", "error"})
+    """
+    if not req.question or not req.question.strip():
+        raise HTTPException(status_code=400, detail="Empty question")
+    require_ready()
+    cached, vector = semantic_cache.lookup(req.question)
+
+    def events():
+        if cached is not None:
+            yield ndjson({"type": "token", "text": cached["answer"]})
+            yield ndjson({"type": "done", "sources": cached["sources"]})
+            return
+        parts: List[str] = []
+        docs = []
+        try:
+            # rag_chain.stream yields {"docs": [...]} once, then {"answer": <token>} chunks
+            for chunk in rag_chain.stream({"question": req.question, "vector": vector}):
+                if "docs" in chunk:
+                    docs = chunk["docs"]
+                if chunk.get("answer"):
+                    parts.append(chunk["answer"])
+                    yield ndjson({"type": "token", "text": chunk["answer"]})
+        except Exception as e:
+            yield ndjson({"type": "error", "error": str(e)})
+            return
+        sources = sources_of(docs)
+        semantic_cache.store(req.question, vector, "".join(parts), sources)
+        yield ndjson({"type": "done", "sources": sources})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,218 @@
+# semantic_cache.py
+"""Semantic answer cache for the RAG server.
+
+A question is embedded once; if a past question is close enough (cosine
+similarity above the threshold) its stored answer and sources are returned
+instead of running a new generation. Entries expire by TTL, the least recently
+used entry is evicted when the cache is full, and the entries are saved to a
+JSON file (at most every save_interval seconds, and on shutdown) so the cache
+survives restarts.
+
+ingest.py writes an ingest marker next to the Chroma files; when the marker
+changes the cache (answered from the old collection) is dropped.
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INGEST_MARKER = "ingest_marker.json"
+
+# Answers differ per league - a cached answer is only reused for the same ones
+_LEAGUES = re.compile(r"\b(fiba|nba|wnba|ncaa|euroleague)\b", re.IGNORECASE)
+
+
+def read_ingest_marker(db_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(db_dir, INGEST_MARKER), encoding="utf-8") as f:
+            return json.load(f).get("ingest_id")
+    except (OSError, ValueError):
+        return None
+
+
+def write_ingest_marker(db_dir: str, chunks: int) -> str:
+    """Called by ingest.py after the collection is written."""
+    ingest_id = f"{time.time():.6f}-{chunks}"
+    _write_json(os.path.join(db_dir, INGEST_MARKER), {"ingest_id": ingest_id, "chunks": chunks})
+    return ingest_id
+
+
+def _write_json(path: str, data) -> None:
+    # Write to a temp file and rename, so a crash never leaves half a file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _leagues(question: str) -> frozenset:
+    return frozenset(m.lower() for m in _LEAGUES.findall(question))
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        embed: Callable[[str], Sequence[float]],
+        path: str,
+        db_dir: str,
+        model: str,
+        threshold: float = 0.92,
+        max_entries: int = 500,
+        ttl: float = 7 * 24 * 3600,
+        marker_check_interval: float = 5.0,
+        save_interval: float = 30.0,
+    ):
+        self.embed = embed
+        self.path = path
+        self.db_dir = db_dir
+        self.model = model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.marker_check_interval = marker_check_interval
+        self.save_interval = save_interval
+        self.on_invalidate: List[Callable[[], None]] = []
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._entries: List[dict] = []  # question, answer, sources, created, last_used
+        self._vectors = np.zeros((0, 0), dtype=np.float32)  # one unit-length row per entry
+        self._ingest_id = read_ingest_marker(db_dir)
+        self._marker_checked = time.monotonic()
+        self._saved_at = 0.0
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._load()
+
+    # ---------- lookup / store ----------
+    def lookup(self, question: str) -> Tuple[Optional[dict], np.ndarray]:
+        """Returns (cached payload or None, question vector). Reuse the vector on a miss."""
+        self._check_marker()
+        vector = self._unit(self.embed(question))
+        leagues = _leagues(question)
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            if len(self._entries):
+                scores = self._vectors @ vector
+                for i in np.argsort(-scores):
+                    if scores[i] < self.threshold:
+                        break
+                    entry = self._entries[i]
+                    if _leagues(entry["question"]) == leagues:
+                        entry["last_used"] = now
+                        self.hits += 1
+                        return {"answer": entry["answer"], "sources": entry["sources"]}, vector
+            self.misses += 1
+        return None, vector
+
+    def store(self, question: str, vector: np.ndarray, answer: str, sources: list) -> None:
+        if self.max_entries <= 0:
+            return
+        now = time.time()
+        entry = {"question": question, "answer": answer, "sources": sources,
+                 "created": now, "last_used": now}
+        with self._lock:
+            self._purge_expired(now)
+            if len(self._entries) >= self.max_entries:
+                self._remove([min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])])
+            self._entries.append(entry)
+            row = vector.reshape(1, -1)
+            self._vectors = row if not self._vectors.size else np.vstack([self._vectors, row])
+            self._dirty = True
+        if time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = []
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self._dirty = True
+        self.save()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+                "ingest_id": self._ingest_id,
+            }
+
+    # ---------- internals ----------
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _remove(self, indexes: List[int]) -> None:
+        drop = set(indexes)
+        keep = [i for i in range(len(self._entries)) if i not in drop]
+        self._entries = [self._entries[i] for i in keep]
+        self._vectors = self._vectors[keep] if keep else np.zeros((0, 0), dtype=np.float32)
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [i for i, e in enumerate(self._entries) if now - e["created"] > self.ttl]
+        if expired:
+            self._remove(expired)
+
+    def _check_marker(self) -> None:
+        # A stat + small read at most every marker_check_interval seconds
+        now = time.monotonic()
+        if now - self._marker_checked < self.marker_check_interval:
+            return
+        self._marker_checked = now
+        ingest_id = read_ingest_marker(self.db_dir)
+        if ingest_id == self._ingest_id:
+            return
+        self._ingest_id = ingest_id
+        self.invalidations += 1
+        self.clear()
+        for callback in self.on_invalidate:
+            callback()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Answers from another collection or another embedding model are useless
+        if data.get("ingest_id") != self._ingest_id or data.get("model") != self.model:
+            return
+        now = time.time()
+        entries = [e for e in data.get("entries", []) if now - e["created"] <= self.ttl]
+        entries = sorted(entries, key=lambda e: e["last_used"])[-self.max_entries:] if self.max_entries > 0 else []
+        if entries:
+            self._vectors = np.array([self._unit(e.pop("vector")) for e in entries], dtype=np.float32)
+            self._entries = entries
+
+    def save(self) -> None:
+        """Write the entries to disk if anything changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._saved_at = time.monotonic()
+            data = {
+                "ingest_id": self._ingest_id,
+                "model": self.model,
+                "entries": [dict(e, vector=v.tolist()) for e, v in zip(self._entries, self._vectors)],
+            }
+        with self._save_lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            _write_json(self.path, data)
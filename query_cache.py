@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def _copy_value(value):
+    """העתקה של תוצאה מה-cache כדי שה-views יוכלו לשנות אותה בלי לפגוע ב-cache"""
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    # שורות תוצאה (Row) - העתק זול שמשתף את הערכים
+    copy = getattr(value, 'copy', None)
+    if copy is not None:
+        return copy()
+    return value
+
+
+class QueryCache:
+    """cache בזיכרון לתוצאות שאילתות - LRU חסום עם TTL לכל רשומה
+
+    המפתחות הם tuples שהאיבר הראשון בהם הוא ה-namespace (למשל
+    ('registrations', game_id)), כך שאפשר לבטל את כל המפתחות שמתחילים
+    ב-prefix מסוים אחרי כתיבה.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._namespaces = {}  # namespace -> set of keys
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self):
+        """מונה שעולה בכל ביטול - ערך שנטען לפני ביטול לא נשמר"""
+        return self._generation
+
+    def get(self, key, default=None):
+        """החזרת ערך מה-cache או default אם הוא חסר / פג תוקף"""
+        if self.max_entries <= 0:
+            return default
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_value(entry[1])
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl, generation=None):
+        """שמירת ערך ל-ttl שניות. אם generation השתנה מאז הטעינה - לא שומרים"""
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            # אם הייתה כתיבה בזמן הטעינה, הערך שנטען עלול להיות ישן
+            if generation is not None and generation != self._generation:
+                return
+            self._store(key, value, time.monotonic() + ttl)
+
+    def get_or_load(self, key, ttl, loader, reload=False):
+        """החזרת ערך מה-cache, או טעינה דרך loader ושמירה ל-ttl שניות
+
+        reload=True טוען תמיד (ושומר את הערך החדש) - לקריאות שחייבות לראות כתיבה.
+        """
+        if self.max_entries <= 0:
+            return loader()
+
+        missing = object()
+        generation = self._generation
+        value = missing if reload else self.get(key, missing)
+        if value is not missing:
+            return value
+
+        value = loader()
+        self.set(key, value, ttl, generation)
+        return _copy_value(value)
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        self._namespaces.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget(old_key)
+            self.evictions += 1
+
+    def _forget(self, key):
+        keys = self._namespaces.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespaces[key[0]]
+
+    def invalidate(self, *prefix):
+        """ביטול כל המפתחות שמתחילים ב-prefix, למשל invalidate('registrations', 5)"""
+        with self._lock:
+            self._generation += 1
+            keys = self._namespaces.get(prefix[0])
+            if not keys:
+                return
+            size = len(prefix)
+            for key in [k for k in keys if k[:size] == prefix]:
+                del self._entries[key]
+                self._forget(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._namespaces.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
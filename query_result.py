@@ -0,0 +1,103 @@
+class Row:
+    """שורת תוצאה - ערכים ב-tuple ומפת עמודות משותפת לכל שורות התוצאה
+
+    מתנהגת כמו dict לקריאה: row['col'], row.get('col'), 'col' in row, dict(row),
+    ו-Jinja מגיע לשדות גם דרך game.title. אפשר גם להוסיף שדות (game['x'] = ...) -
+    הם נשמרים בנפרד ולא משנים את הערכים המקוריים.
+    """
+
+    __slots__ = ('_values', '_index', '_extra')
+
+    def __init__(self, values, index):
+        self._values = values
+        self._index = index
+        self._extra = None
+
+    def __getitem__(self, key):
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        return self._values[self._index[key]]
+
+    def __setitem__(self, key, value):
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __contains__(self, key):
+        return key in self._index or (self._extra is not None and key in self._extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        if self._extra is None:
+            return list(self._index)
+        return list(self._index) + [key for key in self._extra if key not in self._index]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def copy(self):
+        """העתק זול - ה-tuple של הערכים ומפת העמודות משותפים"""
+        row = Row(self._values, self._index)
+        if self._extra is not None:
+            row._extra = dict(self._extra)
+        return row
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            return self.items() == other.items()
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Row({self.to_dict()!r})"
+
+
+# מפות עמודות משותפות - אותה רשימת עמודות משתמשת באותו dict בכל התוצאות
+_column_indexes = {}
+
+
+def column_index(columns):
+    """מפת עמודה -> מיקום, משותפת לכל התוצאות עם אותן עמודות"""
+    key = tuple(columns)
+    index = _column_indexes.get(key)
+    if index is None:
+        index = {name: i for i, name in enumerate(key)}
+        if len(_column_indexes) < 1024:
+            _column_indexes[key] = index
+    return index
+
+
+class QueryResult:
+    """תוצאת שאילתה אחת"""
+
+    __slots__ = ('columns', 'rows', 'last_insert_rowid', 'rows_affected')
+
+    def __init__(self, columns=(), rows=None, last_insert_rowid=None, rows_affected=None):
+        self.columns = tuple(columns)
+        self.rows = rows if rows is not None else []
+        self.last_insert_rowid = last_insert_rowid
+        self.rows_affected = rows_affected
+
+    @classmethod
+    def from_values(cls, columns, value_rows, **kwargs):
+        """בניית תוצאה מרשימת tuples של ערכים"""
+        index = column_index(columns)
+        return cls(columns, [Row(values, index) for values in value_rows], **kwargs)
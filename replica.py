@@ -0,0 +1,268 @@
+import sqlite3
+import threading
+import time
+from query_result import QueryResult
+
+SCHEMA_QUERY = (
+    "SELECT type, name, tbl_name, sql FROM sqlite_master "
+    "WHERE type IN ('table', 'index', 'trigger') AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+    "ORDER BY type DESC, name"
+)
+
+# יומן השינויים מ-migrations/0004 - triggers בשם row_changes_<table>_<event>
+CHANGE_LOG = 'row_changes'
+VERSION_QUERY = f"SELECT COALESCE(MAX(version), 0) AS version FROM {CHANGE_LOG}"
+
+
+class LocalReplica:
+    """עותק מקומי (SQLite) של מסד הנתונים לקריאות מהירות
+
+    הקריאות רצות מול הקובץ המקומי. העותק מתעדכן מה-primary בשתי דרכים:
+    סנכרון ברקע שמושך רק את השורות שהשתנו מאז הסנכרון הקודם, לפי יומן
+    השינויים (row_changes) שה-triggers ב-primary מעדכנים בכל הכנסה, עדכון
+    ומחיקה, ומשיכה חלקית של שורות שהשתנו (refresh) אחרי כל כתיבה.
+
+    max_staleness הוא גבול ולא טיימר: קריאה מעותק ישן ממנו הולכת ל-primary.
+    קריאה מעותק ישן מ-sync_interval מתחילה סנכרון ברקע ולא מחכה לו.
+    רק טבלאות עם triggers של היומן מועתקות, ובלי היומן (מיגרציה 0004 לא
+    הורצה) העותק אף פעם לא נחשב עדכני. בנייה מלאה של הטבלאות קורית רק
+    בסנכרון הראשון או כשהסכמה ב-primary השתנתה.
+
+    execute_batch היא הפונקציה שמריצה שאילתות מול ה-primary
+    (DatabaseManager.execute_batch). עמודות ב-private_columns (למשל
+    {'users': ('password_hash',)}) לא מועתקות - בעותק הן מחרוזת ריקה.
+    """
+
+    def __init__(self, path, execute_batch, max_staleness=5.0, sync_interval=None, private_columns=None):
+        self.path = path
+        self.max_staleness = max_staleness
+        self.sync_interval = sync_interval if sync_interval is not None else max_staleness / 2
+        self.private_columns = {table: set(columns) for table, columns in (private_columns or {}).items()}
+        self._execute_batch = execute_batch
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._syncer = None
+        self._schema = None
+        self._tables = None
+        self._select = {}  # table -> רשימת העמודות לשאילתה מה-primary
+        self.version = 0  # ה-version האחרון ביומן שהעותק כבר כולל
+        self.tracked = False
+        self.last_sync = None
+        self.last_error = None
+        self.syncs = 0
+        self.rebuilds = 0
+        self.rows_pulled = 0
+        self.refreshes = 0
+        self.reads = 0
+
+    def age(self):
+        return time.monotonic() - self.last_sync if self.last_sync is not None else None
+
+    def is_fresh(self):
+        age = self.age()
+        return self.tracked and age is not None and age <= self.max_staleness
+
+    def ensure_fresh(self):
+        """האם אפשר לקרוא מהעותק עכשיו - ומתחיל סנכרון ברקע אם הגיע הזמן"""
+        age = self.age()
+        if age is None or age > self.sync_interval:
+            self.sync_in_background()
+        return self.is_fresh()
+
+    def sync_in_background(self):
+        """סנכרון ב-thread ברקע (לכל היותר אחד בכל רגע)"""
+        with self._lock:
+            if self._syncer is not None and self._syncer.is_alive():
+                return self._syncer
+            self._syncer = threading.Thread(target=self._background_sync, name='replica-sync', daemon=True)
+            self._syncer.start()
+            return self._syncer
+
+    def _background_sync(self):
+        try:
+            self.sync()
+            self.last_error = None
+        except Exception as e:
+            # הקריאות ממשיכות ל-primary עד שסנכרון יצליח
+            self.last_error = str(e)
+
+    def sync(self):
+        """משיכת השינויים מה-primary - השורות שה-version שלהן ביומן חדש מהסנכרון הקודם"""
+        with self._sync_lock:
+            started = time.monotonic()
+            if self._tables is None:
+                self._rebuild(self._execute_batch([SCHEMA_QUERY])[0].rows)
+            else:
+                self._pull()
+            self.last_sync = started
+            self.syncs += 1
+
+    def _pull(self):
+        if not self.tracked:
+            # אין יומן ב-primary - בודקים רק אם מיגרציה הוסיפה אותו
+            schema = self._execute_batch([SCHEMA_QUERY])[0].rows
+            if self._schema_key(schema) != self._schema:
+                self._rebuild(schema)
+            return
+
+        # בקשה אחת: הסכמה, ה-version הנוכחי, השורות שהשתנו ביומן והתוכן העדכני שלהן.
+        # ה-version נקרא לפני השינויים - שינוי שנכנס באמצע יימשך שוב בסנכרון הבא
+        tables = sorted(self._tables)
+        statements = [
+            SCHEMA_QUERY,
+            VERSION_QUERY,
+            (f"SELECT table_name, row_id FROM {CHANGE_LOG} WHERE version > ?", (self.version,)),
+        ]
+        for table in tables:
+            statements.append((
+                f'SELECT {self._select[table]} FROM "{table}" WHERE rowid IN '
+                f'(SELECT row_id FROM {CHANGE_LOG} WHERE version > ? AND table_name = ?)',
+                (self.version, table),
+            ))
+        results = self._execute_batch(statements)
+
+        schema = results[0].rows
+        if self._schema_key(schema) != self._schema:
+            # מיגרציה ב-primary - בונים את העותק מחדש
+            self._rebuild(schema)
+            return
+
+        changed = {}
+        for row in results[2].rows:
+            changed.setdefault(row['table_name'], []).append((row['row_id'],))
+
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for i, table in enumerate(tables):
+                    # שורה שהשתנתה נמחקת ונכתבת מחדש; שורה שנמחקה ב-primary לא חוזרת
+                    self._conn.executemany(f'DELETE FROM "{table}" WHERE rowid = ?', changed.get(table, []))
+                    rows = results[3 + i].rows
+                    self._insert_rows(table, rows)
+                    self.rows_pulled += len(rows)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self.version = results[1].rows[0]['version']
+
+    def _rebuild(self, schema):
+        """בנייה מלאה של העותק - בסנכרון הראשון ואחרי שינוי סכמה"""
+        tracked = {row['tbl_name'] for row in schema
+                   if row['type'] == 'trigger' and row['name'].startswith(CHANGE_LOG + '_')}
+        has_log = any(row['type'] == 'table' and row['name'] == CHANGE_LOG for row in schema)
+        if not has_log:
+            tracked = set()
+        # רק טבלאות שהיומן עוקב אחריהן (ו-triggers לא מועתקים)
+        local_schema = [row for row in schema if row['type'] != 'trigger' and row['tbl_name'] in tracked]
+        tables = [row['name'] for row in local_schema if row['type'] == 'table']
+        select = self._select_lists(local_schema)
+        data = self._execute_batch(([VERSION_QUERY] if has_log else [])
+                                   + [f'SELECT {select[table]} FROM "{table}"' for table in tables])
+        version = data.pop(0).rows[0]['version'] if has_log else 0
+
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                # בונים את הטבלאות מחדש כדי לקלוט גם שינויי סכמה (מיגרציות) ב-primary.
+                # טבלאות קודם (ORDER BY type DESC) ואז האינדקסים שלהן
+                old_tables = [row[0] for row in self._conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+                for table in set(old_tables) | set(tables):
+                    self._conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+                for row in local_schema:
+                    self._conn.execute(row['sql'])
+                for table, result in zip(tables, data):
+                    self._insert_rows(table, result.rows)
+                    self.rows_pulled += len(result.rows)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._tables = set(tables)
+            self._select = select
+            self._schema = self._schema_key(schema)
+            self.version = version
+            self.tracked = has_log
+        self.rebuilds += 1
+
+    def _select_lists(self, schema):
+        """רשימת העמודות לכל טבלה: rowid, ועמודות פרטיות כמחרוזת ריקה"""
+        scratch = sqlite3.connect(':memory:')
+        try:
+            select = {}
+            for row in schema:
+                if row['type'] != 'table':
+                    continue
+                scratch.execute(row['sql'])
+                private = self.private_columns.get(row['name'], set())
+                columns = [info[1] for info in scratch.execute(f'PRAGMA table_info("{row["name"]}")')]
+                select[row['name']] = ', '.join(
+                    ['rowid AS "rowid"'] + [f"'' AS \"{col}\"" if col in private else f'"{col}"' for col in columns])
+            return select
+        finally:
+            scratch.close()
+
+    @staticmethod
+    def _schema_key(schema):
+        return tuple((row['type'], row['name'], row['sql']) for row in schema)
+
+    def refresh(self, table, where, params=()):
+        """משיכה חלקית אחרי כתיבה - מחליף את השורות שעונות ל-where בגרסה מה-primary"""
+        if self._tables is None or table not in self._tables:
+            return
+        result = self._execute_batch([(f'SELECT {self._select[table]} FROM "{table}" WHERE {where}', params)])[0]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute(f'DELETE FROM "{table}" WHERE {where}', tuple(params))
+                self._insert_rows(table, result.rows)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        self.refreshes += 1
+
+    def _insert_rows(self, table, rows):
+        if not rows:
+            return
+        columns = list(rows[0].keys())
+        column_list = ', '.join(f'"{col}"' for col in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        # INSERT OR REPLACE - שורה שכבר הגיעה ב-refresh מוחלפת בגרסה מהסנכרון
+        self._conn.executemany(
+            f'INSERT OR REPLACE INTO "{table}" ({column_list}) VALUES ({placeholders})',
+            [tuple(row[col] for col in columns) for row in rows]
+        )
+
+    def query(self, query, params=None):
+        """הרצת שאילתת קריאה מול העותק המקומי - מחזיר רשימת שורות"""
+        with self._lock:
+            cursor = self._conn.execute(query, tuple(params or ()))
+            columns = [d[0] for d in cursor.description]
+            rows = QueryResult.from_values(columns, cursor.fetchall()).rows
+        self.reads += 1
+        return rows
+
+    def stats(self):
+        age = self.age()
+        return {
+            'path': self.path,
+            'max_staleness': self.max_staleness,
+            'sync_interval': self.sync_interval,
+            'age': round(age, 3) if age is not None else None,
+            'fresh': self.is_fresh(),
+            'syncing': self._syncer is not None and self._syncer.is_alive(),
+            'tracked': self.tracked,
+            'version': self.version,
+            'syncs': self.syncs,
+            'rebuilds': self.rebuilds,
+            'rows_pulled': self.rows_pulled,
+            'refreshes': self.refreshes,
+            'reads': self.reads,
+            'last_error': self.last_error,
+        }
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+
+from db_metrics import metrics, normalize_sql
+
+# "SCAN games" בלי אינדקס = מעבר על כל הטבלה
+_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(?!CONSTANT ROW)(\w+)(?:\s+AS\s+\w+)?(?!.*USING (?:COVERING )?INDEX)', re.IGNORECASE)
+
+
+def full_scans(plan):
+    """הטבלאות שנסרקות במלואן לפי תוצאת EXPLAIN QUERY PLAN"""
+    tables = []
+    for detail in plan:
+        match = _FULL_SCAN.match(detail)
+        if match and match.group(1) not in tables:
+            tables.append(match.group(1))
+    return tables
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+
+class SlowQueryLog:
+    """לוג שאילתות איטיות - שורת JSON לכל קריאה מעל הסף, לקובץ מתחלף
+
+    קריאה עם כמה שאילתות (batch) נרשמת פעם אחת, תחת ה-fingerprint של
+    ה-batch, כי הזמן שנמדד הוא של הקריאה כולה ולא של כל שאילתה בה.
+
+    לקריאות עם זמן מצטבר הגבוה ביותר מריצים EXPLAIN QUERY PLAN על דגימה,
+    ברקע, ורושמים את התוכנית ואת הטבלאות שנסרקות במלואן.
+    """
+
+    def __init__(self, path, threshold_ms=200.0, explain=None, explain_top=5,
+                 explain_sample=0.2, explain_interval=600.0, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.threshold = threshold_ms / 1000.0
+        self.path = path
+        self._explain = explain
+        self.explain_top = explain_top
+        self.explain_sample = explain_sample
+        self.explain_interval = explain_interval
+        self._lock = threading.Lock()
+        self._stats = {}  # fingerprint -> [count, total seconds, max seconds]
+        self._explained = {}  # fingerprint -> זמן ה-EXPLAIN האחרון
+        self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        handler.setFormatter(_JSONFormatter())
+        self.logger = logging.getLogger(f'{__name__}.{id(self)}')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(handler)
+
+    def observe(self, statements, seconds, results, fingerprint=None):
+        """רישום קריאה שהסתיימה - statements הם ה-stmt של ה-pipeline, results התוצאות שלהם"""
+        if seconds < self.threshold:
+            return
+        if fingerprint is None:
+            fingerprint = metrics.batch_fingerprint(stmt['sql'] for stmt in statements)
+
+        entries = [{'fingerprint': metrics.fingerprint(stmt['sql']),
+                    'sql': metrics.fingerprint_sql(metrics.fingerprint(stmt['sql'])),
+                    'rows': len(getattr(result, 'rows', ()))}
+                   for stmt, result in zip(statements, results)]
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = self._stats[fingerprint] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            worst = self._worst()
+
+        self.logger.info({
+            'event': 'slow_query',
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'fingerprint': fingerprint,
+            'duration_ms': round(seconds * 1000, 2),
+            'threshold_ms': round(self.threshold * 1000, 2),
+            'rows': sum(entry['rows'] for entry in entries),
+            'statements': entries,
+        })
+
+        if self._explain is None or fingerprint not in worst or not self._should_explain(fingerprint):
+            return
+        # תוכנית לכל צורה שונה של שאילתה ב-batch
+        explained = set()
+        for stmt, entry in zip(statements, entries):
+            if entry['fingerprint'] not in explained:
+                explained.add(entry['fingerprint'])
+                self._explainer.submit(self._run_explain, fingerprint, stmt)
+
+    def _worst(self):
+        ranked = sorted(self._stats.items(), key=lambda item: item[1][1], reverse=True)
+        return {fp for fp, _ in ranked[:self.explain_top]}
+
+    def _should_explain(self, fingerprint):
+        if random.random() >= self.explain_sample:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(fingerprint)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            self._explained[fingerprint] = now
+        return True
+
+    def _run_explain(self, fingerprint, stmt):
+        """EXPLAIN QUERY PLAN לשאילתה לדוגמה - רץ בלי מדידה כדי לא להירשם בעצמו"""
+        explain_stmt = dict(stmt, sql='EXPLAIN QUERY PLAN ' + stmt['sql'])
+        try:
+            result = self._explain(explain_stmt)
+            plan = [row['detail'] for row in result.rows]
+            record = {'plan': plan, 'full_scans': full_scans(plan)}
+        except Exception as e:
+            record = {'error': str(e)}
+        with self._lock:
+            count, total, worst = self._stats.get(fingerprint, (0, 0.0, 0.0))
+        record.update({
+            'event': 'explain',
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'fingerprint': fingerprint,
+            'sql': normalize_sql(stmt['sql']),
+            'count': count,
+            'total_ms': round(total * 1000, 2),
+            'max_ms': round(worst * 1000, 2),
+        })
+        self.logger.info(record)
+
+    def stats(self):
+        """הקריאות האיטיות לפי fingerprint, מהזמן המצטבר הגבוה לנמוך"""
+        with self._lock:
+            ranked = sorted(self._stats.items(), key=lambda item: item[1][1], reverse=True)
+            return [{
+                'fingerprint': fp,
+                'sql': metrics.fingerprint_sql(fp),
+                'count': count,
+                'total_ms': round(total * 1000, 2),
+                'max_ms': round(worst * 1000, 2),
+            } for fp, (count, total, worst) in ranked]
+
+    def close(self):
+        self._explainer.shutdown(wait=False)
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
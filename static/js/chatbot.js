@@ -72,13 +72,18 @@ class ChatBot {
     }
     
     async checkServerConnection() {
+        // Readiness probe only - a real question would use up a slot and the rate limit
         setTimeout(async () => {
             try {
-                await fetch('/api/chatbot', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ question: 'test' })
-                });
+                const response = await fetch('/api/chatbot/health');
+                const data = await response.json();
+                if (data.status === 'ready') {
+                    this.updateStatus('success', 'מחובר');
+                } else if (data.status === 'loading') {
+                    this.updateStatus('warning', 'נטען...');
+                } else {
+                    this.updateStatus('danger', 'לא מחובר');
+                }
             } catch (error) {
                 this.updateStatus('warning', 'בדיקת חיבור...');
             }
@@ -94,15 +99,7 @@ class ChatBot {
             minute: '2-digit'
         });
         
-        let sourcesHtml = '';
-        if (sources && sources.length > 0) {
-            sourcesHtml = `
-                <div class="sources">
-                    <small>מקורות:</small><br>
-                    ${sources.map(s => `<span class="source-item">${s.source} עמ' ${s.page}</span>`).join('')}
-                </div>
-            `;
-        }
+        const sourcesHtml = this.renderSources(sources);
         
         messageDiv.innerHTML = `
             <div class="message-avatar">
@@ -119,6 +116,29 @@ class ChatBot {
         
         this.chatMessages.appendChild(messageDiv);
         this.scrollToBottom();
+        return messageDiv;
+    }
+    
+    renderSources(sources) {
+        if (!sources || sources.length === 0) {
+            return '';
+        }
+        return `
+            <div class="sources">
+                <small>מקורות:</small><br>
+                ${sources.map(s => `<span class="source-item">${s.source} עמ' ${s.page}</span>`).join('')}
+            </div>
+        `;
+    }
+    
+    // Bot message that is filled in while the answer streams
+    startBotMessage() {
+        const messageDiv = this.addMessage('', false);
+        const bubble = messageDiv.querySelector('.message-bubble');
+        const text = document.createElement('span');
+        text.className = 'streamed-text';
+        bubble.prepend(text);
+        return { bubble, text };
     }
     
     scrollToBottom() {
@@ -159,7 +179,7 @@ class ChatBot {
         this.sendBtn.disabled = true;
         
         try {
-            const response = await fetch('/api/chatbot', {
+            const response = await fetch('/api/chatbot/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -167,14 +187,11 @@ class ChatBot {
                 body: JSON.stringify({ question: question })
             });
             
-            const data = await response.json();
-            
-            this.hideTyping();
-            
             if (response.ok) {
-                this.addMessage(data.answer, false, data.sources);
-                this.updateStatus('success', 'מחובר');
+                await this.readAnswerStream(response);
             } else {
+                const data = await response.json();
+                this.hideTyping();
                 this.addMessage(data.error || 'שגיאה לא ידועה', false, null, true);
                 this.updateStatus('danger', 'שגיאה');
             }
@@ -192,6 +209,59 @@ class ChatBot {
         }
     }
     
+    // NDJSON from /api/chatbot/stream: token events, then done (with sources) or error
+    async readAnswerStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let message = null;
+        let answer = '';
+        let finished = false;
+        
+        const handleEvent = (event) => {
+            if (event.type === 'error') {
+                this.hideTyping();
+                this.addMessage(event.error || 'שגיאה לא ידועה', false, null, true);
+                this.updateStatus('danger', 'שגיאה');
+                finished = true;
+                return;
+            }
+            if (!message) {
+                // First token - the typing indicator becomes the answer
+                this.hideTyping();
+                message = this.startBotMessage();
+            }
+            if (event.type === 'token') {
+                answer += event.text;
+                message.text.textContent = answer;
+                this.scrollToBottom();
+            } else if (event.type === 'done') {
+                message.bubble.insertAdjacentHTML('beforeend', this.renderSources(event.sources));
+                this.updateStatus('success', 'מחובר');
+                this.scrollToBottom();
+                finished = true;
+            }
+        };
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) {
+            handleEvent(JSON.parse(buffer));
+        }
+        
+        if (!finished) {
+            this.hideTyping();
+            this.addMessage('התשובה נקטעה - נסה שוב', false, null, true);
+            this.updateStatus('danger', 'שגיאה');
+        }
+    }
+    
     clearChat() {
         if (confirm('האם אתה בטוח שברצונך לנקות את השיחה?')) {
             // Keep the first bot message
@@ -282,6 +352,10 @@ const systemMessageStyles = `
     .user-message .message-bubble a {
         color: rgba(255, 255, 255, 0.9);
     }
+    
+    .message-bubble .streamed-text {
+        white-space: pre-wrap;
+    }
 `;
 
 const styleSheet = document.createElement('style');
@@ -94,21 +94,53 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // עדכון דינמי של המשתתפים
 function refreshParticipants() {
-    // בהנחה שיש נתיב API זמין
     const gameId = window.location.pathname.split('/').pop();
-    fetch(`/api/game/${gameId}/registrations`)
+    fetch(`/api/game/${gameId}/registrations?limit=50`)
         .then(response => response.json())
         .then(data => {
-            console.log('Participants updated:', data);
-            // כאן אפשר לעדכן את רשימת המשתתפים דינמית
+            const byPosition = {};
+            data.registrations.forEach(registration => {
+                byPosition[registration.position_name] = registration;
+            });
+            
+            // עדכון מפת המגרש - תפוס/פנוי ושם השחקן
+            document.querySelectorAll('.position-spot').forEach(spot => {
+                const registration = byPosition[spot.dataset.position];
+                spot.classList.toggle('taken', Boolean(registration));
+                spot.classList.toggle('available', !registration);
+                const tooltip = spot.querySelector('.position-tooltip');
+                if (tooltip) {
+                    tooltip.textContent = registration ? registration.first_name : 'פנוי';
+                }
+            });
         })
         .catch(error => {
             console.log('Error refreshing participants:', error);
         });
 }
 
-// עדכון כל 30 שניות
-setInterval(refreshParticipants, 30000);
+// עדכונים מהשרת (SSE) - בקשה רק כשההרשמות באמת משתנות
+function subscribeToGameEvents() {
+    const gameId = window.location.pathname.split('/').pop();
+    
+    if (!window.EventSource) {
+        setInterval(refreshParticipants, 30000);
+        return;
+    }
+    
+    const source = new EventSource(`/api/game/${gameId}/events`);
+    source.addEventListener('registrations', refreshParticipants);
+    // פספסנו יותר מדי אירועים בזמן הניתוק - טוענים הכל מחדש
+    source.addEventListener('reset', refreshParticipants);
+    source.addEventListener('error', function() {
+        // השרת סירב (למשל עומס) - הדפדפן לא ינסה שוב, חוזרים ל-polling
+        if (source.readyState === EventSource.CLOSED) {
+            setInterval(refreshParticipants, 30000);
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', subscribeToGameEvents);
 
 // פונקציות עזר נוספות
 function highlightSelectedPosition(positionId) {
@@ -92,6 +92,11 @@ function initializeFilters() {
     
     // Clear filters
     clearFilters.addEventListener('click', function() {
+        // חיפוש מהשרת (?q=) - חוזרים לרשימה המלאה
+        if (new URLSearchParams(location.search).has('q')) {
+            location.href = location.pathname;
+            return;
+        }
         searchFilter.value = '';
         dateFilter.value = '';
         availabilityFilter.value = '';
@@ -171,7 +176,7 @@ function initializeAnimations() {
 }
 
 // Auto Refresh
-function initializeAutoRefresh() {
+function startPolling() {
     // Auto-refresh every 2 minutes
     setInterval(() => {
         if (document.visibilityState === 'visible') {
@@ -180,6 +185,51 @@ function initializeAutoRefresh() {
     }, 120000);
 }
 
+function initializeAutoRefresh() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    
+    // רענון רק כשמשחק נוסף או שההרשמות השתנו (SSE)
+    let changed = false;
+    let reloadTimer = null;
+    
+    function reloadWhenVisible() {
+        if (document.visibilityState !== 'visible') {
+            changed = true;
+            return;
+        }
+        // כמה שינויים ברצף (פתיחת משחק פופולרי) - רענון אחד
+        clearTimeout(reloadTimer);
+        reloadTimer = setTimeout(() => location.reload(), 2000);
+    }
+    
+    const source = new EventSource('/api/games/events');
+    source.addEventListener('game_created', reloadWhenVisible);
+    source.addEventListener('registrations', event => {
+        // רק משחקים שמוצגים בעמוד הזה
+        const gameId = JSON.parse(event.data).game_id;
+        if (document.querySelector(`.game-item[data-game-id="${gameId}"]`)) {
+            reloadWhenVisible();
+        }
+    });
+    source.addEventListener('reset', reloadWhenVisible);
+    source.addEventListener('error', () => {
+        // השרת סירב (SSE כבוי או עומס) - הדפדפן לא ינסה שוב, חוזרים ל-polling
+        if (source.readyState === EventSource.CLOSED) {
+            startPolling();
+        }
+    });
+    
+    document.addEventListener('visibilitychange', () => {
+        if (changed && document.visibilityState === 'visible') {
+            changed = false;
+            reloadWhenVisible();
+        }
+    });
+}
+
 // Keyboard Shortcuts
 function initializeKeyboardShortcuts() {
     document.addEventListener('keydown', function(e) {
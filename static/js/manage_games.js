@@ -130,10 +130,9 @@ function initializeParticipantsModal() {
     // Export participants
     document.getElementById('exportParticipants').addEventListener('click', function() {
         if (currentGameId) {
-            fetch(`/api/game/${currentGameId}/registrations`)
-                .then(response => response.json())
-                .then(data => {
-                    exportToCSV(data);
+            fetchAllRegistrations(currentGameId)
+                .then(registrations => {
+                    exportToCSV(registrations);
                 })
                 .catch(error => {
                     console.error('Error exporting participants:', error);
@@ -143,13 +142,30 @@ function initializeParticipantsModal() {
     });
 }
 
+// כל ההרשמות של משחק - ה-API מחזיר עמודים, ממשיכים עד שאין next_cursor
+async function fetchAllRegistrations(gameId) {
+    const registrations = [];
+    let cursor = null;
+    do {
+        const url = `/api/game/${gameId}/registrations?limit=50` +
+            (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const data = await response.json();
+        registrations.push(...data.registrations);
+        cursor = data.next_cursor;
+    } while (cursor);
+    return registrations;
+}
+
 // Load Participants Data
 function loadParticipants(gameId) {
     const participantsList = document.getElementById('participantsList');
     participantsList.innerHTML = '<div class="text-center"><i class="fas fa-spinner fa-spin"></i> טוען...</div>';
     
-    fetch(`/api/game/${gameId}/registrations`)
-        .then(response => response.json())
+    fetchAllRegistrations(gameId)
         .then(data => {
             if (data.length === 0) {
                 participantsList.innerHTML = '<p class="text-muted text-center">עדיין אין משתתפים במשחק זה</p>';
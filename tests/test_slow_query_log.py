@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_metrics import metrics
+from query_result import QueryResult
+from slow_query_log import SlowQueryLog
+
+INSERT = 'INSERT INTO game_registrations (game_id, user_id, position_id) VALUES (?, ?, ?)'
+SELECT = 'SELECT * FROM games WHERE game_id = ?'
+
+
+def _batch(*sqls):
+    return [{'sql': sql, 'args': []} for sql in sqls]
+
+
+class SlowQueryLogBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.log = SlowQueryLog(os.path.join(self.dir.name, 'slow.jsonl'), threshold_ms=0)
+
+    def tearDown(self):
+        self.log.close()
+        self.dir.cleanup()
+
+    def test_batch_is_one_observation(self):
+        """batch של N שאילתות מוסיף את זמן הקריאה פעם אחת ולא N פעמים"""
+        n = 5
+        statements = _batch(*[INSERT] * n)
+        self.log.observe(statements, 0.5, [QueryResult.from_values([], [])] * n)
+
+        stats = self.log.stats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]['count'], 1)
+        self.assertEqual(stats[0]['total_ms'], 500.0)
+
+    def test_batch_fingerprint_does_not_depend_on_size(self):
+        self.assertEqual(metrics.batch_fingerprint([INSERT]), metrics.fingerprint(INSERT))
+        self.assertEqual(metrics.batch_fingerprint([INSERT, SELECT]),
+                         metrics.batch_fingerprint([INSERT, SELECT, INSERT, SELECT]))
+        self.assertNotEqual(metrics.batch_fingerprint([INSERT, SELECT]), metrics.fingerprint(INSERT))
+
+    def test_mixed_batch_is_charged_once(self):
+        statements = _batch(SELECT, INSERT, INSERT)
+        self.log.observe(statements, 0.3, [QueryResult.from_values([], [])] * 3)
+        self.log.observe(_batch(SELECT), 0.1, [QueryResult.from_values([], [])])
+
+        total = sum(entry['total_ms'] for entry in self.log.stats())
+        self.assertEqual(round(total, 2), 400.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+import base64
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP/2 דורש httpx עם h2 - תלות אופציונלית
+try:
+    import httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+
+def encode_value(value):
+    """המרת ערך Python לערך מוקלד של פרוטוקול ה-pipeline (Hrana)"""
+    if value is None:
+        return {'type': 'null'}
+    if isinstance(value, bool):
+        return {'type': 'integer', 'value': '1' if value else '0'}
+    if isinstance(value, int):
+        # מספרים שלמים נשלחים כמחרוזת כדי לא לאבד דיוק ב-JSON
+        return {'type': 'integer', 'value': str(value)}
+    if isinstance(value, float):
+        return {'type': 'float', 'value': value}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'type': 'blob', 'base64': base64.b64encode(bytes(value)).decode('ascii')}
+    return {'type': 'text', 'value': str(value)}
+
+
+def decode_value(value):
+    """המרת ערך מוקלד מהשרת לערך Python"""
+    kind = value['type']
+    if kind == 'null':
+        return None
+    if kind == 'integer':
+        return int(value['value'])
+    if kind == 'float':
+        return float(value['value'])
+    if kind == 'blob':
+        encoded = value['base64']
+        return base64.b64decode(encoded + '=' * (-len(encoded) % 4))
+    return value['value']
+
+
+class PooledTransport:
+    """חיבור HTTP משותף ל-Turso עם pool של חיבורי keep-alive
+
+    אובייקט אחד משותף לכל ה-threads של Flask. מספר הבקשות בו-זמנית מוגבל
+    לגודל ה-pool, ובקשה שצריכה לחכות לחיבור פנוי נספרת ב-waits.
+    """
+
+    def __init__(self, url, token, pool_size=10, http2=False, connect_timeout=5.0, read_timeout=30.0):
+        self.url = url
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+            'User-Agent': 'BasketCheck/1.0'
+        }
+
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._waits = 0
+        self._wait_time = 0.0
+
+        if http2 and not HTTP2_AVAILABLE:
+            print("⚠️ HTTP/2 דורש את החבילה httpx[http2] - ממשיך עם HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.supports_stream = not http2
+
+        if self.http2:
+            self._client = httpx.Client(
+                http2=True,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+        else:
+            self._client = requests.Session()
+            self._client.headers.update(self.headers)
+            self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+            self._client.mount('https://', self._adapter)
+            self._client.mount('http://', self._adapter)
+
+    def post(self, payload):
+        """שליחת בקשת JSON לשרת - מחזיר את אובייקט התגובה"""
+        if not self._slots.acquire(blocking=False):
+            started = time.perf_counter()
+            self._slots.acquire()
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self._waits += 1
+                self._wait_time += waited
+        try:
+            with self._stats_lock:
+                self._requests += 1
+            if self.http2:
+                return self._client.post(self.url, json=payload)
+            return self._client.post(self.url, json=payload, timeout=self.timeout)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def post_stream(self, payload):
+        """שליחת בקשה וקריאת התגובה כזרם (response.raw) - רק ב-HTTP/1.1"""
+        self._slots.acquire()
+        try:
+            with self._stats_lock:
+                self._requests += 1
+            response = self._client.post(self.url, json=payload, timeout=self.timeout, stream=True)
+            response.raw.decode_content = True
+            try:
+                yield response
+            finally:
+                response.close()
+        finally:
+            self._slots.release()
+
+    def _connections_opened(self):
+        """כמה חיבורי TCP נפתחו בפועל (ידוע רק ב-HTTP/1.1)"""
+        if self.http2:
+            return None
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self):
+        """סטטיסטיקות ה-pool לצורך כיוון הגודל שלו"""
+        with self._stats_lock:
+            total = self._requests
+            waits = self._waits
+            wait_time = self._wait_time
+
+        opened = self._connections_opened()
+        reuse_ratio = None
+        if opened is not None and total:
+            reuse_ratio = round(max(0.0, 1 - opened / total), 4)
+
+        return {
+            'pool_size': self.pool_size,
+            'http2': self.http2,
+            'requests': total,
+            'connections_opened': opened,
+            'reuse_ratio': reuse_ratio,
+            'waits': waits,
+            'wait_time_ms': round(wait_time * 1000, 2),
+            'avg_wait_ms': round(wait_time * 1000 / waits, 2) if waits else 0.0,
+        }
+
+    def close(self):
+        self._client.close()
+
+
+class _LocalResponse:
+    """תגובה בפורמט של requests עבור SQLiteTransport"""
+
+    def __init__(self, data):
+        self.status_code = 200
+        self._data = data
+        self.text = ''
+
+    def json(self):
+        return self._data
+
+
+def _run_statement(conn, stmt):
+    """הרצת stmt אחד - מחזיר (result, error) בפורמט של הפרוטוקול"""
+    try:
+        cursor = conn.execute(stmt['sql'], [decode_value(arg) for arg in stmt.get('args', [])])
+        rows = cursor.fetchall()
+        columns = [d[0] for d in cursor.description] if cursor.description else []
+        return {
+            'cols': [{'name': col, 'decltype': None} for col in columns],
+            'rows': [[encode_value(value) for value in row] for row in rows],
+            'affected_row_count': max(cursor.rowcount, 0),
+            'last_insert_rowid': str(cursor.lastrowid) if cursor.lastrowid is not None else None,
+        }, None
+    except sqlite3.Error as e:
+        return None, {'message': str(e), 'code': 'SQLITE_ERROR'}
+
+
+def _condition_met(conn, condition, results, errors):
+    """חישוב condition של צעד ב-batch (ok / error / not / and / or / is_autocommit)"""
+    if condition is None:
+        return True
+    kind = condition['type']
+    if kind == 'ok':
+        return results[condition['step']] is not None
+    if kind == 'error':
+        return errors[condition['step']] is not None
+    if kind == 'not':
+        return not _condition_met(conn, condition['cond'], results, errors)
+    if kind == 'and':
+        return all(_condition_met(conn, c, results, errors) for c in condition['conds'])
+    if kind == 'or':
+        return any(_condition_met(conn, c, results, errors) for c in condition['conds'])
+    if kind == 'is_autocommit':
+        return not conn.in_transaction
+    raise ValueError(f"unsupported condition: {kind}")
+
+
+def _run_batch(conn, batch):
+    """הרצת בקשת batch - כל צעד רץ רק אם ה-condition שלו מתקיים"""
+    results, errors = [], []
+    for step in batch['steps']:
+        result = error = None
+        if _condition_met(conn, step.get('condition'), results, errors):
+            result, error = _run_statement(conn, step['stmt'])
+        results.append(result)
+        errors.append(error)
+    return {'step_results': results, 'step_errors': errors}
+
+
+def run_pipeline(conn, payload):
+    """הרצת בקשת pipeline מול חיבור sqlite3 - מחזיר את גוף התגובה כמו בשרת
+
+    כל execute רץ ב-autocommit כמו ב-Turso, ושגיאה בשאילתה אחת לא עוצרת
+    את השאילתות שאחריה. בקשת batch מריצה צעדים עם תנאים (BEGIN/COMMIT).
+    """
+    results = []
+    for request in payload.get('requests', []):
+        if request['type'] == 'close':
+            results.append({'type': 'ok', 'response': {'type': 'close'}})
+        elif request['type'] == 'batch':
+            results.append({'type': 'ok', 'response': {'type': 'batch', 'result': _run_batch(conn, request['batch'])}})
+        elif request['type'] == 'execute':
+            result, error = _run_statement(conn, request['stmt'])
+            if error is not None:
+                results.append({'type': 'error', 'error': error})
+            else:
+                results.append({'type': 'ok', 'response': {'type': 'execute', 'result': result}})
+        else:
+            results.append({'type': 'error', 'error': {'message': f"unsupported request: {request['type']}"}})
+    return {'baton': None, 'base_url': None, 'results': results}
+
+
+class SQLiteTransport:
+    """מחליף מקומי ל-Turso שמריץ את אותו פרוטוקול מול קובץ SQLite
+
+    משמש כשה-URL הוא file:/path/to/db.sqlite - לבדיקות ולפיתוח בלי ענן.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def post(self, payload):
+        """הרצת בקשת pipeline מול הקובץ המקומי"""
+        with self._lock:
+            self._requests += 1
+            return _LocalResponse(run_pipeline(self._conn, payload))
+
+    def stats(self):
+        return {'backend': 'sqlite', 'path': self.path, 'requests': self._requests}
+
+    def close(self):
+        self._conn.close()